@@ -26,7 +26,7 @@ class ExtractionAgent:
         # Use LLM only if key fields missing
         if not data.get("patient_name") or not data.get("claim_amount"):
             messages = [
-                {"role": "system", "content": "You are an expert medical claims extractor. Return ONLY valid JSON with these fields: patient_name, member_id, claim_amount, service_date, diagnosis_codes, procedure_codes, provider_name, claim_id."},
+                {"role": "system", "content": "You are an expert medical claims extractor. Return ONLY valid JSON with these fields: patient_name, member_id, claim_amount, service_date, diagnosis_codes, procedure_codes, provider_name, provider_id, claim_id."},
                 {"role": "user", "content": f"""Extract claim information from this text. Return valid JSON.
 
 Text:
@@ -93,7 +93,11 @@ Text:
             "diagnosis_codes": list(data.get("diagnosis_codes", [])),
             "procedure_codes": list(data.get("procedure_codes", [])),
             "provider_name": data.get("provider_name", ""),
+            # Watchlist and per-provider fraud state match on the ID when present
+            "provider_id": str(data.get("provider_id") or data.get("provider_npi") or data.get("npi") or "").strip(),
+            "provider_specialty": data.get("provider_specialty", ""),
             "plan_type": data.get("plan_type", "STANDARD"),
+            "justification": data.get("justification", ""),
             "raw_text_preview": str(data)[:500] if len(str(data)) > 500 else str(data),
             "extraction_timestamp": datetime.now().isoformat()
         }
@@ -116,8 +120,10 @@ Text:
             "diagnosis_codes": re.findall(r'[A-Z]\d{2,3}\.?\d*', text),
             "procedure_codes": re.findall(r'\b\d{5}\b', text),
             "provider_name": self._find(text, ["provider", "physician", "doctor", "provider_name", "attending"]),
+            "provider_id": self._find_identifier(text, ["provider id", "provider_id", "provider #", "npi"]),
             "plan_type": self._find(text, ["plan type", "plan_type", "plan", "coverage type"]),
-            "raw_text_preview": text[:500]
+            "raw_text_preview": text[:500],
+            "extraction_timestamp": datetime.now().isoformat()
         }
 
     def _find(self, text, keywords):
@@ -129,6 +135,11 @@ Text:
                 return re.split(r'\n|\||\$|\s{2,}', snippet)[0].strip()
         return ""
 
+    def _find_identifier(self, text, keywords):
+        """First token after the keyword, without the label punctuation"""
+        tokens = self._find(text, keywords).lstrip(":#- ").split()
+        return tokens[0] if tokens else ""
+
     def _find_amount(self, text):
         matches = re.findall(r'\$[\d,]+\.?\d*', text)
         if matches:
@@ -1,20 +1,84 @@
 # backend/agents/rag.py
+import os
+import hashlib
 from pathlib import Path
+from ..utils.lru_cache import LRUCache
+from ..utils.document_parser import DocumentParser, SUPPORTED_SUFFIXES
 
 class RAGAgent:
-    def __init__(self):
+    def __init__(self, cache_size: int = None):
         print("RAG Agent ready (keyword-based)")
-        path = Path(__file__).parent.parent / "data" / "sample_policies"
-        self.policies = {}
-        for f in path.glob("*.txt"):
-            self.policies[f.name] = f.read_text(encoding="utf-8")
+        backend_dir = Path(__file__).parent.parent
+        self.sources = [backend_dir / "data" / "sample_policies", backend_dir / "docs"]
+        self.parser = DocumentParser()
+        if cache_size is None:
+            cache_size = int(os.getenv("RAG_CACHE_SIZE", "512"))
+        self.cache = LRUCache(cache_size)
+        # (policies, lowered policies, version), swapped as one reference so a
+        # concurrent search never mixes two reloads
+        self._index = ({}, {}, "")
+        self.reload()
+
+    @property
+    def policies(self) -> dict:
+        return self._index[0]
+
+    @property
+    def index_version(self) -> str:
+        return self._index[2]
+
+    def reload(self):
+        """
+        Re-read the policy sources and bump the index version.
+        Cached retrievals from the previous version are dropped.
+        Unchanged documents are served from the on-disk parse cache.
+        """
+        policies = {}
+        for source in self.sources:
+            if not source.exists():
+                continue
+            for f in sorted(source.iterdir()):
+                if f.is_file() and f.suffix.lower() in SUPPORTED_SUFFIXES:
+                    text = self.parser.parse(f)
+                    if text is not None:
+                        policies[f.name] = text
+
+        digest = hashlib.sha256()
+        for name, content in policies.items():
+            digest.update(name.encode("utf-8"))
+            digest.update(content.encode("utf-8"))
+
+        lowered = {name: content.lower() for name, content in policies.items()}
+        version = digest.hexdigest()[:12]
+        self._index = (policies, lowered, version)
+        self.cache.clear()
+        return version
 
     def retrieve(self, claim_data: dict, top_k=3):
         keywords = claim_data.get("diagnosis_codes", []) + claim_data.get("procedure_codes", [])
+        codes = tuple(sorted(str(kw).strip().upper() for kw in keywords))
+        index = self._index
+        key = (index[2], codes, top_k)
+
+        cached = self.cache.get(key)
+        if cached is None:
+            cached = self._search(index, codes, top_k)
+            self.cache.put(key, cached)
+        # Hand out copies so callers can't mutate the cached entries
+        return [dict(r) for r in cached]
+
+    def _search(self, index, codes, top_k):
+        policies, lowered_policies, _ = index
+        lowered_codes = [code.lower() for code in codes]
         results = []
-        for name, content in self.policies.items():
-            score = sum(1 for kw in keywords if kw.lower() in content.lower())
+        for name, content in policies.items():
+            lowered = lowered_policies[name]
+            score = sum(1 for kw in lowered_codes if kw in lowered)
             if score > 0:
                 results.append({"source": name, "score": score, "content": content[:800]})
         results.sort(key=lambda x: x["score"], reverse=True)
-        return results[:top_k]
\ No newline at end of file
+        return tuple(results[:top_k])
+
+    def cache_stats(self) -> dict:
+        """Retrieval cache statistics for the current index version"""
+        return {"index_version": self.index_version, **self.cache.stats()}
@@ -260,6 +260,16 @@ class SummarizationAgent:
                     "reason": validation_details.get('authorization', {}).get('reason', 'N/A'),
                     "icon": "✅" if validation_details.get('authorization', {}).get('status') == 'PASSED' else "⚠️"
                 },
+                "medical_necessity": {
+                    "status": validation_details.get('medical_necessity', {}).get('status', 'UNKNOWN'),
+                    "reason": validation_details.get('medical_necessity', {}).get('reason', 'N/A'),
+                    "icon": "✅" if validation_details.get('medical_necessity', {}).get('status') == 'PASSED' else "⚠️"
+                },
+                "frequency": {
+                    "status": validation_details.get('frequency', {}).get('status', 'UNKNOWN'),
+                    "reason": validation_details.get('frequency', {}).get('reason', 'N/A'),
+                    "icon": "✅" if validation_details.get('frequency', {}).get('status') == 'PASSED' else "⚠️"
+                },
                 "business_rules": {
                     "status": validation_details.get('business_rules', {}).get('status', 'UNKNOWN'),
                     "reason": validation_details.get('business_rules', {}).get('reason', 'N/A'),
@@ -1,29 +1,84 @@
 
 # backend/agents/validation.py
-import json
-from pathlib import Path
+import threading
+from collections import Counter
+from contextlib import contextmanager
+import numpy as np
 from ..utils.ollama_client import ask_llama
+from ..utils.eligibility_spans import parse_date
+from ..utils.claims_history import ClaimsHistoryStore
+from ..utils.reference_data import ReferenceDataManager
+from ..utils.columnar import to_records, flatten, first_per_owner
 
 class ValidationAgent:
     def __init__(self):
         print("Hybrid Validation Agent ready")
-        self.members = self._load_json("data/members.json")
-        self.rules = self._load_json("data/coverage_rules.json")
+        self.reference = ReferenceDataManager()
+        self.history = ClaimsHistoryStore()
+        self._pinned = threading.local()
 
-    def _load_json(self, rel_path):
-        path = Path(__file__).parent.parent / rel_path
-        return json.loads(path.read_text()) if path.exists() else {}
+    @contextmanager
+    def _pin_snapshot(self):
+        """
+        Use one reference-data snapshot for the whole of a validate() call,
+        even if a reload swaps in a newer one meanwhile
+        """
+        outer = getattr(self._pinned, "snapshot", None)
+        snapshot = outer or self.reference.snapshot
+        self._pinned.snapshot = snapshot
+        try:
+            yield snapshot
+        finally:
+            self._pinned.snapshot = outer
+
+    def _snapshot(self):
+        return getattr(self._pinned, "snapshot", None) or self.reference.snapshot
+
+    @property
+    def members(self):
+        return self._snapshot().members
+
+    @property
+    def rules(self):
+        return self._snapshot().coverage
+
+    @property
+    def authorizations(self):
+        return self._snapshot().authorizations
+
+    @property
+    def necessity(self):
+        return self._snapshot().necessity
+
+    @property
+    def frequency(self):
+        return self._snapshot().frequency
+
+    @property
+    def fees(self):
+        return self._snapshot().fees
+
+    def reload_reference_data(self, force: bool = False) -> dict:
+        """
+        Reload reference data now instead of waiting for the background poll
+        """
+        self.reference.reload(force=force)
+        return self.reference.status()
 
     def validate(self, claim_data: dict) -> dict:
         """
         Comprehensive claim validation with multiple checks
         """
-        result = {
-            "eligibility": self._check_eligibility(claim_data),
-            "coverage": self._check_coverage(claim_data),
-            "authorization": self._check_authorization(claim_data),
-            "business_rules": self._check_business_rules(claim_data)
-        }
+        with self._pin_snapshot() as snapshot:
+            result = {
+                "eligibility": self._check_eligibility(claim_data),
+                "coverage": self._check_coverage(claim_data),
+                "authorization": self._check_authorization(claim_data),
+                "medical_necessity": self._check_medical_necessity(claim_data),
+                "frequency": self._check_frequency(claim_data),
+                "business_rules": self._check_business_rules(claim_data)
+            }
+            pricing = self.fees.price(claim_data)
         
         # Determine final decision based on all checks
         statuses = [r["status"] for r in result.values()]
@@ -37,81 +92,208 @@ class ValidationAgent:
         
         return {
             "decision": decision,
-            "details": result
+            "details": result,
+            "pricing": pricing,
+            "data_version": snapshot.version
         }
 
+    def validate_batch(self, batch) -> list:
+        """
+        Validate a columnar batch of claims (dict of columns, pandas DataFrame,
+        pyarrow Table or list of dicts). Eligibility, coverage, authorization
+        and business rules are evaluated as masks over the whole batch; the
+        output matches calling validate() on each claim.
+        """
+        claims = to_records(batch)
+        with self._pin_snapshot() as snapshot:
+            checks = {
+                "eligibility": self.check_eligibility_bulk(claims),
+                "coverage": self.rules.check_coverage_batch(claims),
+                "authorization": self._check_authorization_batch(claims),
+                "medical_necessity": [self._check_medical_necessity(c) for c in claims],
+                "frequency": [self._check_frequency(c) for c in claims],
+                "business_rules": self._check_business_rules_batch(claims)
+            }
+            pricing = self.fees.price_batch(claims)
+
+        status_codes = {"PASSED": 0, "NEEDS_REVIEW": 1, "FAILED": 2}
+        worst = np.zeros(len(claims), dtype=np.int8)
+        for results in checks.values():
+            worst = np.maximum(worst, np.array([status_codes.get(r["status"], 0) for r in results], dtype=np.int8))
+        decisions = np.array(["APPROVED", "NEEDS_REVIEW", "DENIED"])[worst]
+
+        return [
+            {
+                "decision": str(decisions[i]),
+                "details": {name: results[i] for name, results in checks.items()},
+                "pricing": pricing[i],
+                "data_version": snapshot.version
+            }
+            for i in range(len(claims))
+        ]
+
+    def price_batch(self, claims: list) -> list:
+        """
+        Line-level allowed/paid amounts for a batch of claims in one vectorized pass
+        """
+        return self.fees.price_batch(claims)
+
     def _check_eligibility(self, claim_data: dict) -> dict:
         """
-        Check if member is eligible for coverage
+        Check if member is eligible for coverage on the service date
         """
         member_id = claim_data.get("member_id", "")
         
         # If no members data, assume eligible (for testing)
-        if not self.members:
+        if self.members.is_empty():
             return {"status": "PASSED", "reason": "Member validation bypassed (no data)"}
         
-        # Check if member exists
-        if member_id in self.members:
-            member = self.members[member_id]
-            
-            # Check if member is active
-            if member.get("status", "").upper() == "ACTIVE":
-                return {"status": "PASSED", "reason": "Member active and eligible"}
-            else:
-                return {"status": "FAILED", "reason": f"Member status: {member.get('status', 'UNKNOWN')}"}
-        else:
+        # Check if member exists (indexed lookup, hot members served from LRU)
+        member, spans = self.members.get_coverage(member_id)
+        if member is None:
             return {"status": "FAILED", "reason": "Member ID not found in system"}
 
+        service_date = parse_date(claim_data.get("service_date"))
+        covered = None
+        if spans is not None and service_date is not None:
+            covered = spans.covers(service_date)
+        return self._eligibility_result(member, spans, service_date, covered)
+
+    def check_eligibility_bulk(self, claims: list) -> list:
+        """
+        Eligibility for many claims at once: one store lookup per distinct
+        member, and each member's service dates checked in a single pass
+        over their coverage spans
+        """
+        if self.members.is_empty():
+            return [{"status": "PASSED", "reason": "Member validation bypassed (no data)"} for _ in claims]
+
+        by_member = {}
+        for i, claim in enumerate(claims):
+            by_member.setdefault(claim.get("member_id", ""), []).append(i)
+
+        results = [None] * len(claims)
+        for member_id, indexes in by_member.items():
+            member, spans = self.members.get_coverage(member_id)
+            if member is None:
+                for i in indexes:
+                    results[i] = {"status": "FAILED", "reason": "Member ID not found in system"}
+                continue
+
+            dates = [parse_date(claims[i].get("service_date")) for i in indexes]
+            dated = [k for k, d in enumerate(dates) if d is not None]
+            covered = [None] * len(indexes)
+            if spans is not None and dated:
+                for k, hit in zip(dated, spans.covers_many([dates[k] for k in dated])):
+                    covered[k] = hit
+            for k, i in enumerate(indexes):
+                results[i] = self._eligibility_result(member, spans, dates[k], covered[k])
+        return results
+
+    def _eligibility_result(self, member: dict, spans, service_date, covered) -> dict:
+        status = member.get("status", "")
+        has_end_dates = "termination_date" in member or "coverage_spans" in member
+
+        # A non-active member with no recorded end date can't be placed in time
+        if status.upper() != "ACTIVE" and not (has_end_dates and covered):
+            return {"status": "FAILED", "reason": f"Member status: {member.get('status', 'UNKNOWN')}"}
+
+        if covered is None:
+            # No span data or no readable service date: status alone decides
+            return {"status": "PASSED", "reason": "Member active and eligible"}
+        if covered:
+            return {"status": "PASSED", "reason": f"Member eligible on service date {service_date.isoformat()}"}
+        return {"status": "FAILED", "reason": f"Member not covered on service date {service_date.isoformat()}"}
+
     def _check_coverage(self, claim_data: dict) -> dict:
         """
-        Check if the procedure codes are covered
+        Check if the procedure codes are valid and covered by the member's plan
         """
-        procedure_codes = claim_data.get("procedure_codes", [])
-        diagnosis_codes = claim_data.get("diagnosis_codes", [])
-        
-        # Basic validation - check if codes exist
-        if not procedure_codes:
-            return {"status": "FAILED", "reason": "No procedure codes provided"}
-        
-        if not diagnosis_codes:
-            return {"status": "FAILED", "reason": "No diagnosis codes provided"}
-        
-        # Check for known invalid codes (example - extend this list)
-        invalid_procedures = ["99999", "00000"]
-        invalid_diagnoses = ["Z99.99"]
-        
-        for code in procedure_codes:
-            if code in invalid_procedures:
-                return {"status": "FAILED", "reason": f"Invalid procedure code: {code}"}
-        
-        for code in diagnosis_codes:
-            if code in invalid_diagnoses:
-                return {"status": "FAILED", "reason": f"Invalid diagnosis code: {code}"}
-        
-        # If coverage rules exist, check them
-        if self.rules:
-            # Add your coverage rule logic here
-            pass
-        
-        return {"status": "PASSED", "reason": "All codes are valid and covered"}
+        return self.rules.check_coverage(claim_data)
 
     def _check_authorization(self, claim_data: dict) -> dict:
         """
-        Check if procedures require prior authorization
+        Check if procedures require prior authorization and whether one is on
+        file with enough units left for every line billing the code
         """
         procedure_codes = claim_data.get("procedure_codes", [])
+        rules = self.rules
         
-        # High-cost procedures requiring authorization
-        auth_required = ["80050", "99285", "99291"]  # Add more as needed
-        
-        for code in procedure_codes:
-            if code in auth_required:
+        required = Counter(code for code in procedure_codes if code in rules.auth_required)
+        if not required:
+            return {"status": "PASSED", "reason": "No authorization required"}
+
+        member_id = claim_data.get("member_id", "")
+        service_date = parse_date(claim_data.get("service_date"))
+        claim_id = str(claim_data.get("claim_id", "")).strip()
+        auth_ids = []
+        for code, units in required.items():
+            auth = self._usable_authorization(member_id, code, service_date, units, claim_id)
+            if auth is None:
+                needed = f" for {units} units" if units > 1 else ""
                 return {
                     "status": "NEEDS_REVIEW",
-                    "reason": f"Procedure {code} requires prior authorization"
+                    "reason": f"Procedure {code} requires prior authorization{needed}"
                 }
+            auth_ids.append(auth["auth_id"] or code)
         
-        return {"status": "PASSED", "reason": "No authorization required"}
+        return {"status": "PASSED", "reason": f"Prior authorization on file: {', '.join(auth_ids)}"}
+
+    def _usable_authorization(self, member_id: str, code: str, service_date, units: int, claim_id: str):
+        """
+        First authorization covering the service date with at least `units`
+        left once lines already accepted against it (claims history, this
+        claim excluded) are taken off
+        """
+        for auth in self.authorizations.candidates(member_id, code, service_date):
+            used = self.history.count(
+                str(member_id).strip(), [code], auth["start_date"], auth["end_date"], exclude_claim_id=claim_id
+            )
+            if auth["units_remaining"] - used >= units:
+                return auth
+        return None
+
+    def _check_authorization_batch(self, claims: list) -> list:
+        """
+        Batch form of _check_authorization: the auth-required mask is computed
+        over all lines at once, and only flagged claims hit the registry
+        """
+        rules = self.rules
+        codes, owners = flatten([c.get("procedure_codes", []) for c in claims])
+        required = np.fromiter((code in rules.auth_required for code in codes), dtype=bool, count=len(codes))
+        needs_auth = first_per_owner(required, owners, len(claims)) >= 0
+
+        results = []
+        for i, claim in enumerate(claims):
+            if needs_auth[i]:
+                results.append(self._check_authorization(claim))
+            else:
+                results.append({"status": "PASSED", "reason": "No authorization required"})
+        return results
+
+    def _check_medical_necessity(self, claim_data: dict) -> dict:
+        """
+        Check that every billed procedure is supported by at least one diagnosis
+        """
+        return self.necessity.check(claim_data)
+
+    def _check_frequency(self, claim_data: dict) -> dict:
+        """
+        Check per-member "N per rolling window" limits against claim history
+        """
+        return self.frequency.check(claim_data, self.history)
+
+    def record_claim(self, claim_data: dict):
+        """
+        Add an accepted claim to the history used by frequency checks
+        """
+        self.history.record(claim_data)
+
+    def forget_claim(self, claim_data: dict):
+        """
+        Take a claim back out of the frequency history
+        """
+        self.history.forget(claim_data.get("claim_id", ""))
 
     def _check_business_rules(self, claim_data: dict) -> dict:
         """
@@ -119,9 +301,10 @@ class ValidationAgent:
         """
         amount = claim_data.get("claim_amount", 0)
         provider_name = claim_data.get("provider_name", "")
+        rules = self.rules
         
         # Rule 1: Extremely high amounts need review
-        if amount > 10000:
+        if amount > rules.review_amount:
             return {
                 "status": "NEEDS_REVIEW",
                 "reason": f"High claim amount requires review: ${amount}"
@@ -135,8 +318,7 @@ class ValidationAgent:
             }
         
         # Rule 3: Suspicious provider names
-        suspicious_providers = ["fake", "test", "dummy"]
-        if any(word in provider_name.lower() for word in suspicious_providers):
+        if any(word in provider_name.lower() for word in rules.suspicious_provider_words):
             return {
                 "status": "FAILED",
                 "reason": f"Suspicious provider name: {provider_name}"
@@ -150,3 +332,36 @@ class ValidationAgent:
             }
         
         return {"status": "PASSED", "reason": "All business rules satisfied"}
+
+    def _check_business_rules_batch(self, claims: list) -> list:
+        """
+        Batch form of _check_business_rules using vectorized masks
+        """
+        rules = self.rules
+        amounts = [c.get("claim_amount", 0) for c in claims]
+        providers = [c.get("provider_name", "") for c in claims]
+        amount = np.asarray(amounts, dtype=np.float64)
+        lowered = np.array([p.lower() if p else "" for p in providers], dtype=str)
+
+        high = amount > rules.review_amount
+        missing = np.array([not p for p in providers], dtype=bool) | (lowered == "unknown")
+        suspicious = np.zeros(len(claims), dtype=bool)
+        for word in rules.suspicious_provider_words:
+            suspicious |= np.char.find(lowered, word) >= 0
+        non_positive = amount <= 0
+
+        # Rule order matters: the first matching rule decides
+        rule = np.select([high, missing, suspicious, non_positive], [1, 2, 3, 4], default=0)
+        results = []
+        for i, r in enumerate(rule):
+            if r == 1:
+                results.append({"status": "NEEDS_REVIEW", "reason": f"High claim amount requires review: ${amounts[i]}"})
+            elif r == 2:
+                results.append({"status": "FAILED", "reason": "Provider information missing"})
+            elif r == 3:
+                results.append({"status": "FAILED", "reason": f"Suspicious provider name: {providers[i]}"})
+            elif r == 4:
+                results.append({"status": "FAILED", "reason": "Invalid claim amount"})
+            else:
+                results.append({"status": "PASSED", "reason": "All business rules satisfied"})
+        return results
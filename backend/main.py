@@ -13,10 +13,12 @@ from fastapi.middleware.cors import CORSMiddleware
 try:
     # For deployment (Render, etc.)
     from backend.orchestrator.claims_orchestrator import process_claim as orchestrator_process_claim
+    from backend.orchestrator.claims_orchestrator import rag, validator, fraud_detector, get_claim_result
     from backend.utils.monitoring import monitor
 except ImportError:
     # For local development
     from .orchestrator.claims_orchestrator import process_claim as orchestrator_process_claim
+    from .orchestrator.claims_orchestrator import rag, validator, fraud_detector, get_claim_result
     from .utils.monitoring import monitor
 
 app = FastAPI(
@@ -34,6 +36,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("shutdown")
+def shutdown_workers():
+    """Stop background LLM workers; queued fraud reviews fail instead of hanging"""
+    fraud_detector.shutdown()
+
 @app.get("/")
 def root():
     return {
@@ -67,19 +74,31 @@ async def process_claim_endpoint(file: UploadFile = File(...)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/claims/{request_id}")
+def get_claim(request_id: str):
+    """
+    Get the latest result for a processed claim by the request_id returned
+    from /process-claim. Results returned with "provisional": true are
+    updated here once the fraud LLM review finishes.
+    """
+    result = get_claim_result(request_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"No result stored for request {request_id}")
+    return result
+
 @app.get("/metrics")
 def get_metrics():
     """
     Get comprehensive system metrics
     """
-    return monitor.get_metrics()
+    return monitor.get_metrics(rule_stats=fraud_detector.rule_stats())
 
 @app.get("/metrics/prometheus", response_class=PlainTextResponse)
 def get_prometheus_metrics():
     """
     Get metrics in Prometheus format for monitoring tools
     """
-    return monitor.get_prometheus_metrics()
+    return monitor.get_prometheus_metrics(rule_stats=fraud_detector.rule_stats())
 
 @app.get("/metrics/summary")
 def get_metrics_summary():
@@ -118,6 +137,28 @@ def get_recent_claims():
         "count": len(metrics.get("recent_claims", []))
     }
 
+@app.get("/metrics/rag")
+def get_rag_cache_metrics():
+    """
+    Get policy retrieval cache hit/miss statistics
+    """
+    return rag.cache_stats()
+
+@app.get("/reference-data")
+def get_reference_data_status():
+    """
+    Get the validation reference-data version currently in use
+    """
+    return validator.reference.status()
+
+@app.post("/reference-data/reload")
+def reload_reference_data(force: bool = False):
+    """
+    Reload members, coverage rules and other validation reference data
+    without restarting (in-flight claims finish on their old snapshot)
+    """
+    return validator.reload_reference_data(force=force)
+
 @app.post("/metrics/reset")
 def reset_metrics():
     """
@@ -1,6 +1,9 @@
 # backend/orchestrator/claims_orchestrator.py - WITH MONITORING
-from typing import TypedDict, Annotated, List, Dict, Any
+from typing import TypedDict, Annotated, List, Dict, Any, Optional
 import operator
+import os
+import uuid
+import threading
 
 from langgraph.graph import StateGraph, END
 from langgraph.checkpoint.memory import MemorySaver
@@ -11,6 +14,7 @@ from backend.agents.validation import ValidationAgent
 from backend.agents.fraud import FraudDetectionAgent
 from backend.agents.summarization import SummarizationAgent
 from backend.utils.monitoring import monitor
+from backend.utils.lru_cache import LRUCache
 
 
 # === 1. Define the shared state ===
@@ -28,6 +32,7 @@ class ClaimState(TypedDict):
     
     messages: Annotated[List[str], operator.add]
     tracking: Dict[str, Any]  # For monitoring
+    request_id: str           # Per-invocation key for stored results and late fraud verdicts
 
 
 # === 2. Initialize agents ===
@@ -37,6 +42,87 @@ validator = ValidationAgent()
 fraud_detector = FraudDetectionAgent()
 summarizer = SummarizationAgent()
 
+# Recent results by request ID, so late fraud verdicts can revise them
+claim_results = LRUCache(max_size=int(os.getenv("CLAIM_RESULTS_CACHE_SIZE", "1000")))
+_results_lock = threading.Lock()
+_in_flight = set()      # request IDs still in the pipeline
+_pending_verdicts = {}  # request ID -> late fraud verdict that beat the pipeline (in-flight requests only)
+# Keep the fraud model features and phase timings in API results (they always go to the claims log)
+FRAUD_DEBUG_FEATURES = os.getenv("FRAUD_DEBUG_FEATURES", "0") == "1"
+
+
+def _public_fraud(fraud: Dict[str, Any]) -> Dict[str, Any]:
+    """Fraud result as returned and stored, without the debug fields unless enabled"""
+    if FRAUD_DEBUG_FEATURES:
+        return fraud
+    return {k: v for k, v in fraud.items() if k not in ("features", "timings")}
+
+
+def make_decision(validation: Dict[str, Any], fraud: Dict[str, Any]) -> Dict[str, Any]:
+    v_decision = validation["decision"]
+    f_level = fraud.get("risk_level", "LOW")
+
+    # Decision logic with validation priority
+    if v_decision == "DENIED":
+        return {"decision": "REJECT", "reason": "Validation failed"}
+    elif f_level == "HIGH":
+        return {"decision": "REJECT", "reason": "High fraud risk - claim rejected"}
+    elif f_level == "MEDIUM" or v_decision == "NEEDS_REVIEW":
+        return {"decision": "MANUAL_REVIEW", "reason": "Requires manual review"}
+    else:
+        return {"decision": "APPROVE", "reason": "All clear"}
+
+
+def _apply_fraud_verdict(output: Dict[str, Any], fraud: Dict[str, Any], counted: bool):
+    """
+    Swap in the final fraud result, re-decide and regenerate the summary
+    (caller holds _results_lock). `counted` outputs already went to the monitor.
+    """
+    before = {"final_decision": output["final_decision"], "fraud": output["fraud"]}
+    previous = output["final_decision"]["decision"]
+    decision = make_decision(output["validation"], fraud)
+    output["fraud"] = fraud
+    output["final_decision"] = decision
+    output["provisional"] = False
+    output["summary"] = summarizer.summarize(
+        extracted=output["extracted"],
+        validation=output["validation"],
+        policies=output["policies"],
+        fraud=fraud,
+        final_decision=decision
+    )
+    if counted:
+        monitor.revise_claim(before, output)
+
+    # Keep the frequency history in line with the revised decision
+    if previous == "REJECT" and decision["decision"] != "REJECT":
+        validator.record_claim(output["extracted"])
+    elif previous != "REJECT" and decision["decision"] == "REJECT":
+        validator.forget_claim(output["extracted"])
+
+    if decision["decision"] != previous:
+        print(f"Re-decided {output['file_name']}: {previous} -> {decision['decision']}")
+
+
+def on_late_fraud_verdict(request_id: str, fraud: Dict[str, Any]):
+    monitor.record_fraud_timings({"llm": fraud["timings"]["llm"]})
+    fraud = _public_fraud(fraud)
+    with _results_lock:
+        output = claim_results.get(request_id)
+        if output is not None:
+            _apply_fraud_verdict(output, fraud, counted=True)
+        elif request_id in _in_flight:
+            _pending_verdicts[request_id] = fraud
+        else:
+            # The pipeline failed or the result was already evicted
+            print(f"Dropping late fraud verdict for {request_id}: no stored result")
+
+
+def get_claim_result(request_id: str) -> Optional[Dict[str, Any]]:
+    """Latest stored result for a request, including any re-decision"""
+    with _results_lock:
+        return claim_results.get(request_id)
+
 
 # === 3. Define monitored nodes ===
 def extract_node(state: ClaimState) -> ClaimState:
@@ -60,24 +146,24 @@ def validate_node(state: ClaimState) -> ClaimState:
 def fraud_node(state: ClaimState) -> ClaimState:
     print("Step 4: Running fraud detection...")
     with monitor.track_agent(state["tracking"], "fraud"):
-        fraud = fraud_detector.detect(state["extracted"])
-    return {"fraud": fraud, "messages": ["Fraud check complete"]}
+        request_id = state["request_id"]
+        fraud = fraud_detector.detect(
+            state["extracted"],
+            on_late_verdict=lambda verdict: on_late_fraud_verdict(request_id, verdict)
+        )
+    # Features and timings go to the claims log via tracking, not into the result
+    state["tracking"]["fraud_features"] = fraud.get("features")
+    state["tracking"]["fraud_timings"] = fraud.get("timings") or {}
+    return {"fraud": _public_fraud(fraud), "messages": ["Fraud check complete"]}
 
 def decide_node(state: ClaimState) -> ClaimState:
     print("Step 5: Making final decision...")
     with monitor.track_agent(state["tracking"], "decision"):
-        v_decision = state["validation"]["decision"]
-        f_level = state["fraud"].get("risk_level", "LOW")
-
-        # Decision logic with validation priority
-        if v_decision == "DENIED":
-            decision = {"decision": "REJECT", "reason": "Validation failed"}
-        elif f_level == "HIGH":
-            decision = {"decision": "REJECT", "reason": "High fraud risk - claim rejected"}
-        elif f_level == "MEDIUM" or v_decision == "NEEDS_REVIEW":
-            decision = {"decision": "MANUAL_REVIEW", "reason": "Requires manual review"}
-        else:
-            decision = {"decision": "APPROVE", "reason": "All clear"}
+        decision = make_decision(state["validation"], state["fraud"])
+
+        # Only claims that may be paid count towards frequency limits
+        if decision["decision"] != "REJECT":
+            validator.record_claim(state["extracted"])
 
     return {"final_decision": decision, "messages": ["Decision made"]}
 
@@ -123,12 +209,17 @@ def process_claim(file_bytes: bytes, content_type: str, filename: str) -> Dict[s
     """
     claim_id = filename  # Use filename as claim ID
     tracking = monitor.start_claim(claim_id)
+    # Filenames repeat across uploads; results and late verdicts are keyed per invocation
+    request_id = uuid.uuid4().hex
+    with _results_lock:
+        _in_flight.add(request_id)
     
     inputs = {
         "file_bytes": file_bytes,
         "content_type": content_type,
         "filename": filename,
-        "tracking": tracking
+        "tracking": tracking,
+        "request_id": request_id
     }
     
     config = {"configurable": {"thread_id": "default"}}
@@ -141,6 +232,7 @@ def process_claim(file_bytes: bytes, content_type: str, filename: str) -> Dict[s
         print("\nLANGGRAPH PIPELINE COMPLETE\n")
         
         output = {
+            "request_id": request_id,
             "file_name": filename,
             "extracted": result["extracted"],
             "policies": result["policies"],
@@ -148,15 +240,25 @@ def process_claim(file_bytes: bytes, content_type: str, filename: str) -> Dict[s
             "fraud": result["fraud"],
             "final_decision": result["final_decision"],
             "summary": result["summary"],
+            "provisional": result["fraud"].get("provisional", False),
         }
-        
-        # Log successful completion
-        monitor.complete_claim(tracking, output)
+
+        with _results_lock:
+            late = _pending_verdicts.pop(request_id, None)
+            if late is not None:
+                _apply_fraud_verdict(output, late, counted=False)
+            claim_results.put(request_id, output)
+            _in_flight.discard(request_id)
+            # Log successful completion (under the lock, so a late verdict always revises counted claims)
+            monitor.complete_claim(tracking, output)
         
         return output
         
     except Exception as e:
         print(f"\n❌ ERROR PROCESSING CLAIM: {e}\n")
+        with _results_lock:
+            _in_flight.discard(request_id)
+            _pending_verdicts.pop(request_id, None)
         # Log error
         monitor.complete_claim(tracking, {}, error=str(e))
         raise
\ No newline at end of file
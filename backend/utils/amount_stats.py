@@ -0,0 +1,126 @@
+# backend/utils/amount_stats.py
+"""
+Streaming per-provider and per-(provider, CPT) billed-amount statistics.
+
+Each key holds three floats (count, mean, M2) updated with Welford's
+algorithm, or an exponentially decayed mean/variance when `decay` is set,
+so every update and z-score is O(1). State is snapshotted to JSON with an
+atomic rename every `snapshot_every` updates and reloaded on startup.
+"""
+import os
+import json
+import math
+import threading
+from pathlib import Path
+from typing import Optional, List, Dict, Any
+
+DEFAULT_STATS_PATH = Path(__file__).parent.parent.parent / "state" / "amount_stats.json"
+
+
+def provider_key(claim_data: dict) -> str:
+    """Prefer the provider ID, fall back to the normalized provider name"""
+    provider = claim_data.get("provider_id") or claim_data.get("provider_name") or ""
+    return str(provider).strip().lower()
+
+
+class RunningStats:
+    def __init__(self, decay: float = 0.0, min_samples: int = 10, path=None, snapshot_every: int = 100):
+        if path is None:
+            path = os.getenv("AMOUNT_STATS_PATH", str(DEFAULT_STATS_PATH))
+        self.decay = float(decay)
+        self.min_samples = int(min_samples)
+        self.path = Path(path)
+        self.snapshot_every = int(snapshot_every)
+        self.lock = threading.Lock()
+        self.stats = {}          # key -> [count, mean, m2]
+        self._dirty = 0
+        self._load()
+
+    def _load(self):
+        if self.path.exists():
+            try:
+                self.stats = {k: list(v) for k, v in json.loads(self.path.read_text()).items()}
+            except (json.JSONDecodeError, ValueError):
+                print(f"❌ Could not read amount stats snapshot {self.path}, starting fresh")
+
+    def snapshot(self):
+        """Write the current state to disk (atomic replace)"""
+        with self.lock:
+            data = json.dumps(self.stats, separators=(",", ":"))
+            self._dirty = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(data)
+        os.replace(tmp, self.path)
+
+    def zscore(self, key: str, value: float) -> Optional[float]:
+        """Standard deviations of `value` above the key's mean (None until warmed up)"""
+        state = self.stats.get(key)
+        if state is None or state[0] < self.min_samples:
+            return None
+        count, mean, m2 = state
+        variance = m2 if self.decay else m2 / (count - 1)
+        if variance <= 0:
+            return None
+        return (value - mean) / math.sqrt(variance)
+
+    def update(self, key: str, value: float):
+        with self.lock:
+            state = self.stats.get(key)
+            if state is None:
+                self.stats[key] = [1, float(value), 0.0]
+            else:
+                count, mean, m2 = state
+                delta = value - mean
+                if self.decay:
+                    # Exponentially weighted mean/variance; m2 holds the variance itself
+                    mean += self.decay * delta
+                    m2 = (1 - self.decay) * (m2 + self.decay * delta * delta)
+                else:
+                    mean += delta / (count + 1)
+                    m2 += delta * (value - mean)
+                self.stats[key] = [count + 1, mean, m2]
+            self._dirty += 1
+            due = self.snapshot_every and self._dirty >= self.snapshot_every
+        if due:
+            self.snapshot()
+
+
+class AmountDeviationScorer:
+    """Scores a claim's amount against its provider and (provider, CPT) history"""
+
+    def __init__(self, max_deviation: float = 3.0, stats: RunningStats = None):
+        self.max_deviation = float(max_deviation)
+        if stats is None:
+            stats = RunningStats(decay=float(os.getenv("AMOUNT_STATS_DECAY", "0")))
+        self.stats = stats
+
+    def score(self, claim_data: dict, update: bool = True) -> List[Dict[str, Any]]:
+        """
+        Return the deviations above the threshold for this claim, then fold
+        the claim into the running statistics (unless update=False)
+        """
+        provider = provider_key(claim_data)
+        try:
+            amount = float(claim_data.get("claim_amount", 0) or 0)
+        except (TypeError, ValueError):
+            return []
+        if not provider or amount <= 0:
+            return []
+
+        codes = [str(c).strip() for c in claim_data.get("procedure_codes", [])]
+        line_amounts = claim_data.get("line_amounts") or []
+        observations = [(f"p:{provider}", "provider", amount)]
+        for i, code in enumerate(codes):
+            line = float(line_amounts[i]) if i < len(line_amounts) else amount / len(codes)
+            observations.append((f"pc:{provider}|{code}", f"provider+CPT {code}", line))
+
+        deviations = []
+        for key, label, value in observations:
+            z = self.stats.zscore(key, value)
+            if z is not None and z > self.max_deviation:
+                deviations.append({"scope": label, "zscore": round(z, 2)})
+        if update:
+            for key, _, value in observations:
+                self.stats.update(key, value)
+        return deviations
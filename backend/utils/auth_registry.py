@@ -0,0 +1,222 @@
+# backend/utils/auth_registry.py
+"""
+Local prior-authorization registry indexed by (member_id, procedure_code).
+
+The JSON backend builds an in-memory index: a dict from (member, code) to
+that pair's authorizations sorted by start date, so a check is one dict
+probe plus a bisect. The SQLite backend serves the same lookup from a
+composite (member_id, procedure_code, start_date) index for registries
+too large to hold in every worker.
+
+The registry itself is read-only: "units_remaining" is the allowance as of
+the registry export (units minus units_used). Units consumed by claims
+accepted here are counted from the claims history at validation time.
+
+Convert a JSON registry into a SQLite one:
+    python -m backend.utils.auth_registry authorizations.json authorizations.db
+"""
+import os
+import json
+import sqlite3
+import argparse
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+from datetime import date
+from pathlib import Path
+from typing import Optional, Dict, Any, Iterable, Iterator
+
+from .eligibility_spans import parse_date
+
+DEFAULT_REGISTRY_PATH = Path(__file__).parent.parent / "data" / "authorizations.json"
+
+
+def _normalize(entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Validate one registry entry; returns None if it can't be used"""
+    member_id = str(entry.get("member_id", "")).strip()
+    code = str(entry.get("procedure_code", "")).strip()
+    start = parse_date(entry.get("start_date")) or date.min
+    end = parse_date(entry.get("end_date")) or date.max
+    if not member_id or not code or start > end:
+        return None
+    units = int(entry.get("units", 1))
+    used = int(entry.get("units_used", 0))
+    return {
+        "auth_id": str(entry.get("auth_id", "")),
+        "member_id": member_id,
+        "procedure_code": code,
+        "start_date": start,
+        "end_date": end,
+        "units_remaining": units - used
+    }
+
+
+class AuthorizationRegistry(ABC):
+    """Base class: find a usable authorization for a service"""
+
+    def find(self, member_id: str, procedure_code: str, service_date: date) -> Optional[Dict[str, Any]]:
+        return next(iter(self.candidates(member_id, procedure_code, service_date)), None)
+
+    @abstractmethod
+    def candidates(self, member_id: str, procedure_code: str, service_date: date) -> Iterator[Dict[str, Any]]:
+        """Authorizations covering the service date with units left, latest start first"""
+
+    @abstractmethod
+    def __len__(self):
+        """Number of authorizations in the registry"""
+
+
+class JsonAuthorizationRegistry(AuthorizationRegistry):
+    """Registry loaded from a JSON list of authorization entries"""
+
+    def __init__(self, path: Path):
+        path = Path(path)
+        entries = json.loads(path.read_text()) if path.exists() else []
+        if isinstance(entries, dict):
+            entries = entries.get("authorizations", [])
+
+        index = {}
+        for raw in entries:
+            entry = _normalize(raw)
+            if entry is not None:
+                index.setdefault((entry["member_id"], entry["procedure_code"]), []).append(entry)
+
+        self.index = {}
+        self._count = 0
+        for key, auths in index.items():
+            auths.sort(key=lambda a: a["start_date"])
+            self.index[key] = ([a["start_date"] for a in auths], auths)
+            self._count += len(auths)
+
+    def candidates(self, member_id: str, procedure_code: str, service_date: date) -> Iterator[Dict[str, Any]]:
+        bucket = self.index.get((str(member_id).strip(), str(procedure_code).strip()))
+        if bucket is None or service_date is None:
+            return
+        starts, auths = bucket
+        # Walk back from the last authorization that starts on/before the service date
+        i = bisect_right(starts, service_date) - 1
+        while i >= 0:
+            auth = auths[i]
+            if service_date <= auth["end_date"] and auth["units_remaining"] > 0:
+                yield auth
+            i -= 1
+
+    def __len__(self):
+        return self._count
+
+
+class SqliteAuthorizationRegistry(AuthorizationRegistry):
+    """On-disk registry (read-only at runtime)"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections are not shareable across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            self._local.conn = conn
+        return conn
+
+    def candidates(self, member_id: str, procedure_code: str, service_date: date) -> Iterator[Dict[str, Any]]:
+        if service_date is None or not self.path.exists():
+            return
+        day = service_date.isoformat()
+        rows = self._conn().execute(
+            "SELECT auth_id, start_date, end_date, units_remaining FROM authorizations "
+            "WHERE member_id = ? AND procedure_code = ? AND start_date <= ? AND end_date >= ? "
+            "AND units_remaining > 0 ORDER BY start_date DESC",
+            (str(member_id).strip(), str(procedure_code).strip(), day, day)
+        ).fetchall()
+        for row in rows:
+            yield {
+                "auth_id": row[0],
+                "member_id": member_id,
+                "procedure_code": procedure_code,
+                "start_date": date.fromisoformat(row[1]),
+                "end_date": date.fromisoformat(row[2]),
+                "units_remaining": row[3]
+            }
+
+    def __len__(self):
+        if not self.path.exists():
+            return 0
+        return self._conn().execute("SELECT COUNT(*) FROM authorizations").fetchone()[0]
+
+
+def auth_registry_path() -> Path:
+    """Registry location configured by AUTH_REGISTRY_PATH"""
+    return Path(os.getenv("AUTH_REGISTRY_PATH", str(DEFAULT_REGISTRY_PATH)))
+
+
+def open_auth_registry(path=None) -> AuthorizationRegistry:
+    """
+    Open the registry configured by AUTH_REGISTRY_PATH
+    (.db/.sqlite -> SQLite backend, anything else -> JSON backend)
+    """
+    path = Path(path) if path is not None else auth_registry_path()
+    if path.suffix.lower() in (".db", ".sqlite", ".sqlite3"):
+        return SqliteAuthorizationRegistry(path)
+    return JsonAuthorizationRegistry(path)
+
+
+def import_authorizations(entries: Iterable[Dict[str, Any]], db_path: Path, batch_size: int = 50000) -> int:
+    """Write authorization entries into a fresh SQLite registry"""
+    db_path = Path(db_path)
+    tmp_path = db_path.with_suffix(db_path.suffix + ".tmp")
+    if tmp_path.exists():
+        tmp_path.unlink()
+
+    conn = sqlite3.connect(tmp_path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute(
+        "CREATE TABLE authorizations (auth_id TEXT, member_id TEXT NOT NULL, procedure_code TEXT NOT NULL, "
+        "start_date TEXT NOT NULL, end_date TEXT NOT NULL, units_remaining INTEGER NOT NULL)"
+    )
+
+    total = 0
+    batch = []
+    for raw in entries:
+        entry = _normalize(raw)
+        if entry is None:
+            continue
+        batch.append((
+            entry["auth_id"], entry["member_id"], entry["procedure_code"],
+            entry["start_date"].isoformat(), entry["end_date"].isoformat(), entry["units_remaining"]
+        ))
+        if len(batch) >= batch_size:
+            conn.executemany("INSERT INTO authorizations VALUES (?, ?, ?, ?, ?, ?)", batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        conn.executemany("INSERT INTO authorizations VALUES (?, ?, ?, ?, ?, ?)", batch)
+        total += len(batch)
+
+    # Build the index after loading; much faster than maintaining it per insert
+    conn.execute("CREATE INDEX idx_auth_lookup ON authorizations (member_id, procedure_code, start_date)")
+    conn.commit()
+    conn.close()
+
+    # Swap in atomically so running workers never open a half-built registry
+    os.replace(tmp_path, db_path)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a JSON authorization registry into an indexed SQLite store")
+    parser.add_argument("source", help="JSON list of authorizations")
+    parser.add_argument("target", help="SQLite file to create (replaced if it exists)")
+    args = parser.parse_args()
+
+    entries = json.loads(Path(args.source).read_text())
+    if isinstance(entries, dict):
+        entries = entries.get("authorizations", [])
+    count = import_authorizations(entries, Path(args.target))
+    print(f"Imported {count} authorizations into {args.target}")
+
+
+if __name__ == "__main__":
+    main()
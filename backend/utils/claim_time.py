@@ -0,0 +1,41 @@
+# backend/utils/claim_time.py
+"""
+When a claim happened, for the time-windowed fraud state (duplicates,
+velocity, near-duplicates, provider graph). Windows follow the claim's own
+dates rather than the wall clock, so re-scoring a historical batch sees
+the same windows the claims saw when they were live.
+"""
+import time
+from datetime import date, datetime
+from typing import Optional
+
+from .eligibility_spans import parse_date
+
+# Received time first (set by extraction for live claims); the service date otherwise
+_RECEIVED_FIELDS = ("received_at", "received_date", "extraction_timestamp")
+
+
+def _parse_datetime(value) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value).strip())
+    except ValueError:
+        day = parse_date(value)
+        return datetime.combine(day, datetime.min.time()) if day else None
+
+
+def claim_timestamp(claim_data: dict) -> float:
+    """Epoch seconds the claim was received (or serviced); now if it carries no date"""
+    for field in _RECEIVED_FIELDS + ("service_date",):
+        value = claim_data.get(field)
+        if value:
+            moment = _parse_datetime(value)
+            if moment is not None:
+                return moment.timestamp()
+    return time.time()
+
+
+def claim_day(claim_data: dict) -> int:
+    """Date ordinal of claim_timestamp()"""
+    return date.fromtimestamp(claim_timestamp(claim_data)).toordinal()
@@ -0,0 +1,179 @@
+# backend/utils/claims_history.py
+"""
+Local claims-history store for frequency limitation checks.
+
+Claim lines live in SQLite under a composite
+(member_id, procedure_code, service_date) index, so "N per rolling window"
+checks are index range scans whose cost depends on the member's own
+history for that code, not on the size of the table.
+"""
+import os
+import json
+import sqlite3
+import threading
+from bisect import bisect_right
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from .eligibility_spans import parse_date
+
+DEFAULT_LIMITS_PATH = Path(__file__).parent.parent / "data" / "frequency_limits.json"
+DEFAULT_HISTORY_PATH = Path(__file__).parent.parent.parent / "state" / "claims_history.db"
+
+
+class ClaimsHistoryStore:
+    """Append-only claim line history keyed by member, procedure and date"""
+
+    def __init__(self, path=None):
+        if path is None:
+            path = os.getenv("CLAIMS_HISTORY_PATH", str(DEFAULT_HISTORY_PATH))
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS claim_lines ("
+            "claim_id TEXT NOT NULL, line_no INTEGER NOT NULL, member_id TEXT NOT NULL, "
+            "procedure_code TEXT NOT NULL, service_date TEXT NOT NULL, "
+            "PRIMARY KEY (claim_id, line_no))"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_history_lookup "
+            "ON claim_lines (member_id, procedure_code, service_date)"
+        )
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections are not shareable across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            self._local.conn = conn
+        return conn
+
+    def record(self, claim_data: dict) -> int:
+        """Add a claim's lines to history (re-recording the same claim_id is a no-op)"""
+        service_date = parse_date(claim_data.get("service_date"))
+        member_id = str(claim_data.get("member_id", "")).strip()
+        claim_id = str(claim_data.get("claim_id", "")).strip()
+        if service_date is None or not member_id or not claim_id:
+            return 0
+
+        rows = [
+            (claim_id, line_no, member_id, str(code).strip(), service_date.isoformat())
+            for line_no, code in enumerate(claim_data.get("procedure_codes", []))
+        ]
+        conn = self._conn()
+        conn.executemany("INSERT OR IGNORE INTO claim_lines VALUES (?, ?, ?, ?, ?)", rows)
+        conn.commit()
+        return len(rows)
+
+    def forget(self, claim_id: str) -> int:
+        """Remove a claim's lines (e.g. when a re-decision rejects it)"""
+        conn = self._conn()
+        deleted = conn.execute("DELETE FROM claim_lines WHERE claim_id = ?", (str(claim_id).strip(),)).rowcount
+        conn.commit()
+        return deleted
+
+    def count(self, member_id: str, procedure_codes: List[str], start: date, end: date,
+              exclude_claim_id: str = "") -> int:
+        """Number of history lines for the member/codes with start <= service_date <= end"""
+        if not procedure_codes:
+            return 0
+        placeholders = ", ".join("?" for _ in procedure_codes)
+        row = self._conn().execute(
+            f"SELECT COUNT(*) FROM claim_lines WHERE member_id = ? "
+            f"AND procedure_code IN ({placeholders}) AND service_date BETWEEN ? AND ? "
+            f"AND claim_id != ?",
+            (member_id, *procedure_codes, start.isoformat(), end.isoformat(), exclude_claim_id)
+        ).fetchone()
+        return row[0]
+
+    def service_dates(self, member_id: str, procedure_codes: List[str], start: date, end: date,
+                      exclude_claim_id: str = "") -> List[date]:
+        """Sorted service dates of the history lines count() would count"""
+        if not procedure_codes:
+            return []
+        placeholders = ", ".join("?" for _ in procedure_codes)
+        rows = self._conn().execute(
+            f"SELECT service_date FROM claim_lines WHERE member_id = ? "
+            f"AND procedure_code IN ({placeholders}) AND service_date BETWEEN ? AND ? "
+            f"AND claim_id != ? ORDER BY service_date",
+            (member_id, *procedure_codes, start.isoformat(), end.isoformat(), exclude_claim_id)
+        ).fetchall()
+        return [date.fromisoformat(row[0]) for row in rows]
+
+
+class FrequencyLimits:
+    """
+    Rolling-window limits loaded from data/frequency_limits.json. Each limit
+    covers a group of codes that share one allowance (e.g. office visits).
+    """
+    def __init__(self, spec: Dict[str, Any]):
+        self.limits = []
+        self.by_code = {}
+        for limit in spec.get("limits", []):
+            entry = {
+                "name": limit.get("name", ""),
+                "codes": sorted(str(c).strip() for c in limit.get("codes", [])),
+                "max": int(limit["max"]),
+                "window_days": int(limit["window_days"])
+            }
+            self.limits.append(entry)
+            for code in entry["codes"]:
+                self.by_code.setdefault(code, []).append(entry)
+
+    @classmethod
+    def from_file(cls, path: Path = DEFAULT_LIMITS_PATH) -> "FrequencyLimits":
+        path = Path(path)
+        return cls(json.loads(path.read_text()) if path.exists() else {})
+
+    def check(self, claim_data: dict, history: Optional[ClaimsHistoryStore]) -> dict:
+        procedure_codes = [str(c).strip() for c in claim_data.get("procedure_codes", [])]
+        service_date = parse_date(claim_data.get("service_date"))
+        member_id = str(claim_data.get("member_id", "")).strip()
+
+        applicable = []
+        for code in procedure_codes:
+            for limit in self.by_code.get(code, []):
+                if limit not in applicable:
+                    applicable.append(limit)
+        if not applicable:
+            return {"status": "PASSED", "reason": "No frequency limits apply"}
+        if history is None or service_date is None or not member_id:
+            return {"status": "PASSED", "reason": "Frequency check skipped (no history or service date)"}
+
+        claim_id = str(claim_data.get("claim_id", "")).strip()
+        for limit in applicable:
+            on_claim = sum(1 for code in procedure_codes if code in limit["codes"])
+            used = self._busiest_window(history, member_id, limit, service_date, on_claim, claim_id)
+            if used > limit["max"]:
+                return {
+                    "status": "NEEDS_REVIEW",
+                    "reason": f"Frequency limit exceeded: {limit['name']} "
+                              f"({used} in {limit['window_days']} days, max {limit['max']})"
+                }
+        return {"status": "PASSED", "reason": "Within frequency limits"}
+
+    @staticmethod
+    def _busiest_window(history: ClaimsHistoryStore, member_id: str, limit: Dict[str, Any],
+                        service_date: date, on_claim: int, claim_id: str) -> int:
+        """
+        Most lines in any window_days-long window that contains the service
+        date, counting this claim's lines. History after the service date
+        counts too, since claims don't always arrive in service-date order.
+        """
+        reach = timedelta(days=limit["window_days"] - 1)
+        dates = history.service_dates(member_id, limit["codes"], service_date - reach,
+                                      service_date + reach, exclude_claim_id=claim_id)
+        dates = sorted(dates + [service_date] * on_claim)
+        # The busiest window can always be slid right until it starts on a
+        # line dated on/before the service date
+        busiest = 0
+        for i, start in enumerate(dates):
+            if start > service_date:
+                break
+            busiest = max(busiest, bisect_right(dates, start + reach) - i)
+        return busiest
@@ -0,0 +1,191 @@
+# backend/utils/code_index.py
+"""
+Compact sorted-array index of medical code descriptions (ICD-10-CM, CPT).
+
+An index is one file: a header, the codes as a sorted fixed-width byte
+array, description offsets and the UTF-8 description text. It is opened
+with a read-only memory map, so lookups are binary searches over the mapped
+arrays (O(log n) for exact codes and category prefixes), nothing is parsed
+at startup and all workers share the OS page cache instead of each holding
+a private copy.
+
+Build an index from the official code files:
+    python -m backend.utils.code_index icd10 icd10cm_order_2026.txt
+    python -m backend.utils.code_index cpt cpt_codes.txt
+
+ICD-10-CM order files (fixed width, with category headers) and code files
+("A000    Cholera due to ...") are both read; CPT files may be tab-separated
+or CSV with the code in the first column and the description in the second.
+"""
+import os
+import re
+import csv
+import argparse
+from pathlib import Path
+from typing import Optional, Iterable, Tuple, Dict
+
+import numpy as np
+
+DEFAULT_ICD10_INDEX_PATH = Path(__file__).parent.parent.parent / "state" / "icd10cm.codeidx"
+DEFAULT_CPT_INDEX_PATH = Path(__file__).parent.parent.parent / "state" / "cpt.codeidx"
+
+_MAGIC = b"CODEIDX1"
+_HEADER = 24  # magic, count, code width
+_ORDER_LINE = re.compile(r"^\d{5} (\S+)\s+[01] .{60} (.+)$")
+_CODE_LINE = re.compile(r"^(\S+)\s+(.+)$")
+
+
+def normalize_code(code) -> str:
+    """Index key: upper case without the ICD-10 dot (E11.9 -> E119)"""
+    return str(code).strip().upper().replace(".", "")
+
+
+def code_index_path(kind: str) -> Path:
+    """Index location configured by ICD10_INDEX_PATH / CPT_INDEX_PATH"""
+    if kind == "icd10":
+        return Path(os.getenv("ICD10_INDEX_PATH", str(DEFAULT_ICD10_INDEX_PATH)))
+    return Path(os.getenv("CPT_INDEX_PATH", str(DEFAULT_CPT_INDEX_PATH)))
+
+
+def _encode(pairs: Iterable[Tuple[str, str]]) -> bytes:
+    """Serialize (code, description) pairs into the index layout"""
+    entries = {}
+    for code, description in pairs:
+        key = normalize_code(code)
+        if key:
+            entries[key.encode("ascii")] = description.strip().encode("utf-8")
+    codes = sorted(entries)
+    width = max((len(c) for c in codes), default=1)
+    descriptions = [entries[c] for c in codes]
+    offsets = np.zeros(len(codes) + 1, dtype="<i8")
+    np.cumsum([len(d) for d in descriptions], out=offsets[1:])
+
+    code_bytes = np.array(codes, dtype=f"S{width}").tobytes()
+    padding = b"\0" * (-(_HEADER + len(code_bytes)) % 8)  # keep the offsets 8-byte aligned
+    header = _MAGIC + np.array([len(codes), width], dtype="<u8").tobytes()
+    return header + code_bytes + padding + offsets.tobytes() + b"".join(descriptions)
+
+
+class CodeIndex:
+    def __init__(self, buffer: np.ndarray, source: str = "memory"):
+        if bytes(buffer[:8]) != _MAGIC:
+            raise ValueError("not a code index file")
+        n, width = (int(v) for v in buffer[8:_HEADER].view("<u8"))
+        codes_end = _HEADER + n * width
+        offsets_start = codes_end + (-codes_end % 8)
+        text_start = offsets_start + (n + 1) * 8
+        self.codes = buffer[_HEADER:codes_end].view(f"S{width}")
+        self.offsets = buffer[offsets_start:text_start].view("<i8")
+        self.text = buffer[text_start:]
+        self.width = width
+        self.source = source
+
+    @classmethod
+    def from_pairs(cls, pairs: Iterable[Tuple[str, str]]) -> "CodeIndex":
+        """In-memory index (used for the built-in code tables)"""
+        return cls(np.frombuffer(_encode(pairs), dtype=np.uint8))
+
+    @classmethod
+    def open(cls, path: Path) -> "CodeIndex":
+        """Memory-map an index file written by write_code_index()"""
+        return cls(np.memmap(path, dtype=np.uint8, mode="r"), source=str(path))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def _description(self, i: int) -> str:
+        return bytes(self.text[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+    def get(self, code) -> Optional[str]:
+        key = normalize_code(code).encode("ascii", "ignore")
+        if not key or len(key) > self.width:
+            return None
+        i = int(np.searchsorted(self.codes, key))
+        if i < len(self.codes) and self.codes[i] == key:
+            return self._description(i)
+        return None
+
+    def parent(self, code, min_length: int = 3) -> Optional[str]:
+        """Description of the nearest listed ancestor (E11.65 -> E11.6 -> E11)"""
+        key = normalize_code(code)
+        for length in range(min(len(key) - 1, self.width), min_length - 1, -1):
+            description = self.get(key[:length])
+            if description is not None:
+                return description
+        return None
+
+    def first_with_prefix(self, prefix) -> Optional[str]:
+        """Description of the lowest code starting with prefix (category lookup)"""
+        key = normalize_code(prefix).encode("ascii", "ignore")
+        if not key or len(key) > self.width:
+            return None
+        i = int(np.searchsorted(self.codes, key))
+        if i < len(self.codes) and self.codes[i].startswith(key):
+            return self._description(i)
+        return None
+
+
+def read_code_file(path: Path) -> Iterable[Tuple[str, str]]:
+    """(code, description) pairs from an official ICD-10-CM or CPT file"""
+    path = Path(path)
+    with open(path, newline="", encoding="utf-8", errors="replace") as f:
+        if path.suffix.lower() == ".csv":
+            for row in csv.reader(f):
+                if len(row) >= 2 and row[0].strip() and row[0].strip().lower() != "code":
+                    yield row[0], row[1]
+            return
+        for line in f:
+            line = line.rstrip("\r\n")
+            if "\t" in line:
+                code, _, description = line.partition("\t")
+                if code.strip().lower() != "code":
+                    yield code, description
+                continue
+            # Order files carry a short and a long title; keep the long one
+            match = _ORDER_LINE.match(line) or _CODE_LINE.match(line)
+            if match:
+                yield match.group(1), match.group(2)
+
+
+def write_code_index(pairs: Iterable[Tuple[str, str]], path: Path) -> int:
+    """Write a fresh index file; returns the number of codes"""
+    path = Path(path)
+    data = _encode(pairs)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    # Swap in atomically; workers that mapped the old file keep reading it
+    os.replace(tmp, path)
+    return len(CodeIndex(np.frombuffer(data, dtype=np.uint8)))
+
+
+def open_code_index(kind: str, fallback: Dict[str, str]) -> CodeIndex:
+    """
+    The index configured for kind ("icd10" or "cpt"), or an in-memory index
+    of the fallback table when no index file has been built
+    """
+    path = code_index_path(kind)
+    if path.exists():
+        try:
+            index = CodeIndex.open(path)
+            print(f"{kind.upper()} code index ready: {len(index)} codes")
+            return index
+        except (OSError, ValueError) as e:
+            print(f"❌ Could not open code index {path}, using built-in codes: {e}")
+    return CodeIndex.from_pairs(fallback.items())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a memory-mapped ICD-10-CM or CPT code index")
+    parser.add_argument("kind", choices=["icd10", "cpt"])
+    parser.add_argument("source", help="official code file (ICD-10-CM order/codes txt, CPT txt/csv)")
+    parser.add_argument("--target", help="index file to create (default: ICD10_INDEX_PATH / CPT_INDEX_PATH)")
+    args = parser.parse_args()
+
+    target = Path(args.target) if args.target else code_index_path(args.kind)
+    count = write_code_index(read_code_file(args.source), target)
+    print(f"Indexed {count} {args.kind.upper()} codes into {target}")
+
+
+if __name__ == "__main__":
+    main()
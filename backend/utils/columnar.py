@@ -0,0 +1,61 @@
+# backend/utils/columnar.py
+"""
+Helpers for batch (columnar) claim processing
+"""
+import math
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+
+def to_records(batch) -> List[Dict[str, Any]]:
+    """
+    Normalize a batch of claims to a list of claim dicts.
+
+    Accepts a list of dicts, a dict of equal-length columns, a pandas
+    DataFrame or a pyarrow Table. Null cells are dropped so each record
+    looks exactly like a single extracted claim (missing key -> default).
+    """
+    if isinstance(batch, list):
+        return batch
+    if hasattr(batch, "to_pylist"):            # pyarrow.Table
+        columns = batch.to_pydict()
+    elif hasattr(batch, "to_dict"):            # pandas.DataFrame
+        columns = batch.to_dict(orient="list")
+    else:
+        columns = dict(batch)
+
+    names = list(columns)
+    n = len(columns[names[0]]) if names else 0
+    records = []
+    for i in range(n):
+        record = {}
+        for name in names:
+            value = columns[name][i]
+            if value is None or (isinstance(value, float) and math.isnan(value)):
+                continue
+            if isinstance(value, np.ndarray):
+                value = value.tolist()
+            record[name] = value
+        records.append(record)
+    return records
+
+
+def flatten(lists: List[list]) -> Tuple[list, np.ndarray]:
+    """Flatten per-claim lists into one list plus the owning claim index of each item"""
+    values = []
+    owners = []
+    for i, items in enumerate(lists):
+        values.extend(items)
+        owners.extend([i] * len(items))
+    return values, np.asarray(owners, dtype=np.int64)
+
+
+def first_per_owner(mask: np.ndarray, owners: np.ndarray, n: int) -> np.ndarray:
+    """For each of n claims, the index of its first flagged item (-1 if none)"""
+    first = np.full(n, -1, dtype=np.int64)
+    hits = np.flatnonzero(mask)
+    if len(hits):
+        claims, pos = np.unique(owners[hits], return_index=True)
+        first[claims] = hits[pos]
+    return first
@@ -0,0 +1,164 @@
+# backend/utils/coverage_rules.py
+"""
+Declarative coverage rules compiled from data/coverage_rules.json
+"""
+import json
+from pathlib import Path
+from typing import Dict, Any, Optional, List
+
+import numpy as np
+
+from .columnar import flatten, first_per_owner
+
+DEFAULT_RULES_PATH = Path(__file__).parent.parent / "data" / "coverage_rules.json"
+
+
+class PlanRules:
+    """Compiled rules for one plan"""
+    __slots__ = ("name", "covered_procedures", "max_claim_amount")
+
+    def __init__(self, name: str, spec: Dict[str, Any]):
+        self.name = name
+        covered = spec.get("covered_procedures")
+        # None means "no procedure restriction" for this plan
+        self.covered_procedures = frozenset(str(c).strip() for c in covered) if covered else None
+        max_amount = spec.get("max_claim_amount")
+        self.max_claim_amount = float(max_amount) if max_amount is not None else None
+
+
+class CompiledCoverageRules:
+    """
+    Immutable lookup tables built once per rules-file version (see
+    utils/reference_data.py for reloads). Every check is a frozenset/dict
+    probe, so evaluation is O(1) per code.
+    """
+    def __init__(self, spec: Dict[str, Any], version: str = ""):
+        self.version = version
+        self.invalid_procedures = frozenset(spec.get("invalid_procedures", []))
+        self.invalid_diagnoses = frozenset(spec.get("invalid_diagnoses", []))
+        self.auth_required = frozenset(spec.get("auth_required_procedures", []))
+
+        plans = spec.get("plans")
+        if plans is None:
+            # Legacy layout: plans are the top-level objects
+            plans = {k: v for k, v in spec.items() if isinstance(v, dict)}
+        self.plans = {}
+        for name, plan_spec in plans.items():
+            rules = PlanRules(name, plan_spec)
+            key = name.lower()
+            self.plans[key] = rules
+            # Claims carry "STANDARD" while the file uses "standard_plan"
+            if key.endswith("_plan"):
+                self.plans.setdefault(key[:-len("_plan")], rules)
+
+        default = str(spec.get("default_plan", "")).lower()
+        self.default_plan = self.plans.get(default)
+
+        business = spec.get("business_rules", {})
+        self.review_amount = float(business.get("review_amount", 10000))
+        self.suspicious_provider_words = tuple(business.get("suspicious_provider_words", ["fake", "test", "dummy"]))
+
+    @classmethod
+    def from_file(cls, path: Path = DEFAULT_RULES_PATH, version: str = "") -> "CompiledCoverageRules":
+        path = Path(path)
+        return cls(json.loads(path.read_text()) if path.exists() else {}, version)
+
+    def plan_for(self, plan_type) -> Optional[PlanRules]:
+        """Resolve a claim's plan_type, falling back to the default plan"""
+        key = str(plan_type or "").strip().lower().replace(" ", "_")
+        return self.plans.get(key) or self.default_plan
+
+    def check_coverage(self, claim_data: dict) -> dict:
+        procedure_codes = claim_data.get("procedure_codes", [])
+        diagnosis_codes = claim_data.get("diagnosis_codes", [])
+
+        if not procedure_codes:
+            return {"status": "FAILED", "reason": "No procedure codes provided"}
+
+        if not diagnosis_codes:
+            return {"status": "FAILED", "reason": "No diagnosis codes provided"}
+
+        for code in procedure_codes:
+            if code in self.invalid_procedures:
+                return {"status": "FAILED", "reason": f"Invalid procedure code: {code}"}
+
+        for code in diagnosis_codes:
+            if code in self.invalid_diagnoses:
+                return {"status": "FAILED", "reason": f"Invalid diagnosis code: {code}"}
+
+        plan = self.plan_for(claim_data.get("plan_type"))
+        if plan is not None:
+            if plan.covered_procedures is not None:
+                for code in procedure_codes:
+                    if str(code).strip() not in plan.covered_procedures:
+                        return {"status": "FAILED", "reason": f"Procedure {code} not covered under {plan.name}"}
+
+            amount = claim_data.get("claim_amount", 0) or 0
+            if plan.max_claim_amount is not None and amount > plan.max_claim_amount:
+                return {
+                    "status": "FAILED",
+                    "reason": f"Claim amount ${amount} exceeds {plan.name} maximum of ${plan.max_claim_amount:,.0f}"
+                }
+
+        return {"status": "PASSED", "reason": "All codes are valid and covered"}
+
+    def check_coverage_batch(self, claims: List[dict]) -> List[dict]:
+        """
+        Same result as check_coverage for every claim, evaluated as masks
+        over the flattened procedure/diagnosis lines of the whole batch
+        """
+        n = len(claims)
+        proc_lists = [c.get("procedure_codes", []) for c in claims]
+        dx_lists = [c.get("diagnosis_codes", []) for c in claims]
+        procs, proc_owner = flatten(proc_lists)
+        dxs, dx_owner = flatten(dx_lists)
+
+        plans = [self.plan_for(c.get("plan_type")) for c in claims]
+        no_proc = np.array([not p for p in proc_lists], dtype=bool)
+        no_dx = np.array([not d for d in dx_lists], dtype=bool)
+
+        invalid_proc = first_per_owner(
+            np.fromiter((c in self.invalid_procedures for c in procs), dtype=bool, count=len(procs)), proc_owner, n)
+        invalid_dx = first_per_owner(
+            np.fromiter((c in self.invalid_diagnoses for c in dxs), dtype=bool, count=len(dxs)), dx_owner, n)
+
+        # One isin() per distinct plan in the batch
+        stripped = np.array([str(c).strip() for c in procs], dtype=object)
+        plan_ids = np.array([id(p) for p in plans], dtype=np.int64)
+        line_plan_ids = plan_ids[proc_owner] if len(procs) else plan_ids[:0]
+        not_covered_mask = np.zeros(len(procs), dtype=bool)
+        for plan in {id(p): p for p in plans if p is not None}.values():
+            if plan.covered_procedures is None:
+                continue
+            lines = line_plan_ids == id(plan)
+            not_covered_mask[lines] = ~np.isin(stripped[lines].astype(str), list(plan.covered_procedures))
+        not_covered = first_per_owner(not_covered_mask, proc_owner, n)
+
+        amounts = [c.get("claim_amount", 0) or 0 for c in claims]
+        limits = np.array([p.max_claim_amount if p is not None and p.max_claim_amount is not None else np.inf
+                           for p in plans], dtype=np.float64)
+        over_max = np.asarray(amounts, dtype=np.float64) > limits
+
+        results = []
+        for i in range(n):
+            if no_proc[i]:
+                results.append({"status": "FAILED", "reason": "No procedure codes provided"})
+            elif no_dx[i]:
+                results.append({"status": "FAILED", "reason": "No diagnosis codes provided"})
+            elif invalid_proc[i] >= 0:
+                results.append({"status": "FAILED", "reason": f"Invalid procedure code: {procs[invalid_proc[i]]}"})
+            elif invalid_dx[i] >= 0:
+                results.append({"status": "FAILED", "reason": f"Invalid diagnosis code: {dxs[invalid_dx[i]]}"})
+            elif not_covered[i] >= 0:
+                results.append({
+                    "status": "FAILED",
+                    "reason": f"Procedure {procs[not_covered[i]]} not covered under {plans[i].name}"
+                })
+            elif over_max[i]:
+                results.append({
+                    "status": "FAILED",
+                    "reason": f"Claim amount ${amounts[i]} exceeds {plans[i].name} maximum of ${plans[i].max_claim_amount:,.0f}"
+                })
+            else:
+                results.append({"status": "PASSED", "reason": "All codes are valid and covered"})
+        return results
@@ -0,0 +1,102 @@
+# backend/utils/document_parser.py
+"""
+Policy document parsing (TXT, Markdown, DOCX, PDF) with an on-disk parse cache
+"""
+import io
+import os
+import re
+import zipfile
+import hashlib
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Optional
+
+# Bump when parser output changes so stale cache entries are ignored
+PARSER_VERSION = "1"
+
+SUPPORTED_SUFFIXES = {".txt", ".md", ".markdown", ".docx", ".pdf"}
+
+_W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+DEFAULT_CACHE_DIR = Path(__file__).parent.parent.parent / ".cache" / "policy_parse"
+
+
+class DocumentParser:
+    """
+    Converts policy sources to plain text, parsing each distinct file
+    content only once. Parsed text is stored under cache_dir keyed by
+    the SHA-256 of the raw bytes, so restarts and reloads reuse it.
+    """
+    def __init__(self, cache_dir=None):
+        if cache_dir is None:
+            cache_dir = os.getenv("RAG_PARSE_CACHE_DIR", DEFAULT_CACHE_DIR)
+        # Created on the first cache write, not at startup
+        self.cache_dir = Path(cache_dir)
+        self.parsed = 0
+        self.cache_hits = 0
+        self.failed = 0
+
+    def parse(self, path: Path) -> Optional[str]:
+        """
+        Get the plain text of a policy file, using the parse cache.
+        Returns None (and logs why) if the file can't be read or parsed.
+        """
+        try:
+            raw = path.read_bytes()
+            digest = hashlib.sha256(raw).hexdigest()
+            cache_file = self.cache_dir / f"{digest}-v{PARSER_VERSION}.txt"
+
+            if cache_file.exists():
+                self.cache_hits += 1
+                return cache_file.read_text(encoding="utf-8")
+
+            text = self._parse_bytes(raw, path.suffix.lower())
+        except Exception as e:
+            # Corrupt documents or a missing optional parser (pypdf) skip the file
+            self.failed += 1
+            print(f"❌ Skipping policy document {path.name}: {e}")
+            return None
+        self.parsed += 1
+
+        try:
+            # Write then rename so a concurrent reader never sees a partial file
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+            tmp_file.write_text(text, encoding="utf-8")
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            print(f"❌ Could not cache parsed {path.name}: {e}")
+        return text
+
+    def _parse_bytes(self, raw: bytes, suffix: str) -> str:
+        if suffix == ".pdf":
+            return self._parse_pdf(raw)
+        if suffix == ".docx" and zipfile.is_zipfile(io.BytesIO(raw)):
+            return self._parse_docx(raw)
+        if suffix in (".md", ".markdown"):
+            return self._parse_markdown(raw.decode("utf-8", errors="ignore"))
+        # Plain text (also covers .docx files that are really text exports)
+        return raw.decode("utf-8", errors="ignore")
+
+    def _parse_pdf(self, raw: bytes) -> str:
+        from pypdf import PdfReader
+        reader = PdfReader(io.BytesIO(raw))
+        return "\n".join(page.extract_text() or "" for page in reader.pages)
+
+    def _parse_docx(self, raw: bytes) -> str:
+        with zipfile.ZipFile(io.BytesIO(raw)) as z:
+            root = ET.fromstring(z.read("word/document.xml"))
+        paragraphs = []
+        for para in root.iter(f"{_W_NS}p"):
+            text = "".join(node.text or "" for node in para.iter(f"{_W_NS}t"))
+            if text:
+                paragraphs.append(text)
+        return "\n".join(paragraphs)
+
+    def _parse_markdown(self, text: str) -> str:
+        # Strip the markup that would otherwise pollute keyword matching
+        text = re.sub(r"```.*?```", "", text, flags=re.DOTALL)
+        text = re.sub(r"!?\[([^\]]*)\]\([^)]*\)", r"\1", text)
+        text = re.sub(r"^\s{0,3}#{1,6}\s*", "", text, flags=re.MULTILINE)
+        text = re.sub(r"\*{1,3}|`", "", text)
+        return text
@@ -0,0 +1,120 @@
+# backend/utils/duplicate_index.py
+"""
+Sliding-window duplicate-claim index.
+
+Claim fingerprints (member, provider, service date, codes, amount) are kept
+in one hash map for O(1) lookups, and grouped into per-day buckets by the
+day they were received (the claim's received or service date, not the
+wall clock). When a bucket falls out of the window it is dropped together
+with its fingerprints, so memory is bounded by window x daily volume.
+Each bucket is also journaled to its own JSONL file; the files are
+replayed on startup and deleted on eviction.
+"""
+import os
+import json
+import hashlib
+import threading
+from datetime import date
+from pathlib import Path
+from typing import Optional, Dict, Any
+
+from .claim_time import claim_day
+
+DEFAULT_INDEX_DIR = Path(__file__).parent.parent.parent / "state" / "duplicate_index"
+
+
+def claim_fingerprint(claim_data: dict) -> str:
+    """Stable fingerprint of the billable content of a claim"""
+    procedures = sorted(str(c).strip().upper() for c in claim_data.get("procedure_codes", []))
+    diagnoses = sorted(str(c).strip().upper().replace(".", "") for c in claim_data.get("diagnosis_codes", []))
+    try:
+        amount = f"{float(claim_data.get('claim_amount', 0) or 0):.2f}"
+    except (TypeError, ValueError):
+        amount = str(claim_data.get("claim_amount"))
+    parts = [
+        str(claim_data.get("member_id", "")).strip().upper(),
+        str(claim_data.get("provider_name", "")).strip().lower(),
+        str(claim_data.get("service_date", "")).strip(),
+        ",".join(procedures),
+        ",".join(diagnoses),
+        amount,
+    ]
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:20]
+
+
+class DuplicateClaimIndex:
+    def __init__(self, window_days: int = 30, path=None):
+        if path is None:
+            path = os.getenv("DUPLICATE_INDEX_DIR", str(DEFAULT_INDEX_DIR))
+        self.window_days = int(window_days)
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.latest = {}     # fingerprint -> (day ordinal, claim_id)
+        self.buckets = {}    # day ordinal -> [fingerprints]
+        self.newest = 0      # latest claim day recorded; drives eviction
+        self._load()
+
+    def _bucket_file(self, day: int) -> Path:
+        return self.path / f"{date.fromordinal(day).isoformat()}.jsonl"
+
+    def _load(self):
+        for f in sorted(self.path.glob("*.jsonl")):
+            try:
+                day = date.fromisoformat(f.stem).toordinal()
+            except ValueError:
+                continue
+            for line in f.read_text(encoding="utf-8").splitlines():
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn write from a crash
+                self._insert(entry["fp"], day, entry.get("claim_id", ""))
+        # Same horizon as check_and_add, so a restart keeps what the running index kept
+        self._evict(min(self.newest, date.today().toordinal()))
+
+    def _insert(self, fingerprint: str, day: int, claim_id: str):
+        self.latest[fingerprint] = (day, claim_id)
+        self.buckets.setdefault(day, []).append(fingerprint)
+        self.newest = max(self.newest, day)
+
+    def _evict(self, today: int):
+        cutoff = today - self.window_days
+        for day in [d for d in self.buckets if d <= cutoff]:
+            for fingerprint in self.buckets.pop(day):
+                seen = self.latest.get(fingerprint)
+                if seen is not None and seen[0] == day:
+                    del self.latest[fingerprint]
+            self._bucket_file(day).unlink(missing_ok=True)
+
+    def check_and_add(self, claim_data: dict, today: Optional[date] = None,
+                      update: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Return the other matching submission within the window of the claim's
+        date, if any, and record the claim (unless update=False).
+        Re-processing the same claim_id is not a duplicate.
+        """
+        day = today.toordinal() if today else claim_day(claim_data)
+        fingerprint = claim_fingerprint(claim_data)
+        claim_id = str(claim_data.get("claim_id", ""))
+
+        with self.lock:
+            seen = self.latest.get(fingerprint)
+            duplicate = None
+            if seen is not None and seen[1] != claim_id and abs(day - seen[0]) < self.window_days:
+                duplicate = {"claim_id": seen[1], "received": date.fromordinal(seen[0]).isoformat()}
+            if not update:
+                return duplicate
+
+            if seen is None or seen[1] != claim_id or seen[0] != day:
+                # Expire by the newest claim day; capped at today so a mistyped future date can't empty the index
+                horizon = min(max(self.newest, day), date.today().toordinal())
+                self._evict(horizon)
+                if day > horizon - self.window_days:
+                    self._insert(fingerprint, day, claim_id)
+                    with open(self._bucket_file(day), "a", encoding="utf-8") as f:
+                        f.write(json.dumps({"fp": fingerprint, "claim_id": claim_id}) + "\n")
+        return duplicate
+
+    def __len__(self):
+        return len(self.latest)
@@ -0,0 +1,93 @@
+# backend/utils/eligibility_spans.py
+"""
+Member coverage modelled as date spans with a sorted interval index
+"""
+from bisect import bisect_right
+from datetime import date, datetime
+from typing import Optional, Dict, Any, List, Iterable
+
+_DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%Y/%m/%d", "%m-%d-%Y", "%Y%m%d")
+
+
+def parse_date(value) -> Optional[date]:
+    """Parse a claim/roster date, returning None if it can't be read"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value or "").strip()
+    if not text:
+        return None
+    text = text.split("T")[0]
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+class CoverageSpans:
+    """
+    Non-overlapping, sorted coverage spans (inclusive on both ends).
+    Overlapping or adjacent enrollment periods are merged at build time,
+    so a point lookup is a single bisect: O(log k) for k spans.
+    """
+    __slots__ = ("starts", "ends")
+
+    def __init__(self, spans: Iterable[tuple]):
+        merged = []
+        for start, end in sorted(spans):
+            if merged and start.toordinal() <= merged[-1][1].toordinal() + 1:
+                if end > merged[-1][1]:
+                    merged[-1][1] = end
+            else:
+                merged.append([start, end])
+        self.starts = [s for s, _ in merged]
+        self.ends = [e for _, e in merged]
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> Optional["CoverageSpans"]:
+        """
+        Build spans from a roster record. Uses `coverage_spans`
+        ([{"start": ..., "end": ...}]) when present, otherwise
+        `effective_date` / `termination_date`. Returns None when the
+        record carries no date information at all.
+        """
+        raw_spans = record.get("coverage_spans")
+        if raw_spans is None:
+            if not record.get("effective_date") and not record.get("termination_date"):
+                return None
+            raw_spans = [{"start": record.get("effective_date"), "end": record.get("termination_date")}]
+
+        spans = []
+        for span in raw_spans:
+            start = parse_date(span.get("start")) or date.min
+            end = parse_date(span.get("end")) or date.max
+            if start <= end:
+                spans.append((start, end))
+        return cls(spans)
+
+    def covers(self, day: date) -> bool:
+        """True if `day` falls inside any span"""
+        i = bisect_right(self.starts, day) - 1
+        return i >= 0 and day <= self.ends[i]
+
+    def covers_many(self, days: List[date]) -> List[bool]:
+        """
+        Bulk lookup for batch validation: the dates are visited in sorted
+        order with a single forward pass over the spans.
+        """
+        result = [False] * len(days)
+        order = sorted(range(len(days)), key=lambda i: days[i])
+        j = 0
+        n = len(self.starts)
+        for i in order:
+            day = days[i]
+            while j < n and self.ends[j] < day:
+                j += 1
+            result[i] = j < n and self.starts[j] <= day
+        return result
+
+    def __len__(self):
+        return len(self.starts)
@@ -0,0 +1,154 @@
+# backend/utils/fee_schedule.py
+"""
+Allowed-amount adjudication against a per-plan CPT fee schedule.
+
+The schedule in data/fee_schedule.json is loaded into dense NumPy tables
+(plan x CPT) so a whole batch of claims is priced with a handful of array
+operations instead of a Python loop per line.
+
+Each fee has a standard "allowed" amount and an optional "max_allowed"
+(the policy's "Max Allowed w/ Justification"), which applies instead when
+the claim carries a justification.
+"""
+import json
+from pathlib import Path
+from typing import Dict, Any, List
+
+import numpy as np
+
+DEFAULT_SCHEDULE_PATH = Path(__file__).parent.parent / "data" / "fee_schedule.json"
+
+
+class FeeSchedule:
+    def __init__(self, spec: Dict[str, Any]):
+        plans = spec.get("plans", {})
+        self.plan_names = sorted(plans)
+        self.plan_index = {}
+        for i, name in enumerate(self.plan_names):
+            key = name.lower()
+            self.plan_index[key] = i
+            # Claims carry "STANDARD" while the file uses "standard_plan"
+            if key.endswith("_plan"):
+                self.plan_index.setdefault(key[:-len("_plan")], i)
+        self.default_plan = self.plan_index.get(str(spec.get("default_plan", "")).lower(), -1)
+
+        codes = sorted({code for plan in plans.values() for code in plan})
+        self.code_index = {code: i for i, code in enumerate(codes)}
+
+        # NaN marks "code not priced for this plan"
+        self.allowed = np.full((max(len(self.plan_names), 1), max(len(codes), 1)), np.nan)
+        self.max_allowed = np.full_like(self.allowed, np.nan)
+        for p, name in enumerate(self.plan_names):
+            for code, fee in plans[name].items():
+                c = self.code_index[code]
+                self.allowed[p, c] = float(fee["allowed"])
+                self.max_allowed[p, c] = float(fee.get("max_allowed", fee["allowed"]))
+
+    @classmethod
+    def from_file(cls, path: Path = DEFAULT_SCHEDULE_PATH) -> "FeeSchedule":
+        path = Path(path)
+        return cls(json.loads(path.read_text()) if path.exists() else {})
+
+    def _plan_for(self, plan_type) -> int:
+        key = str(plan_type or "").strip().lower().replace(" ", "_")
+        return self.plan_index.get(key, self.default_plan)
+
+    def price(self, claim_data: dict) -> dict:
+        """Price a single claim"""
+        return self.price_batch([claim_data])[0]
+
+    def price_batch(self, claims: List[dict]) -> List[dict]:
+        """
+        Compute line-level allowed and paid amounts for many claims at once.
+
+        Line billed amounts come from `line_amounts` when the claim has them;
+        otherwise `claim_amount` is split across the lines in proportion to
+        their allowed amounts (evenly if any of those lines is unpriced).
+        Paid = min(billed, allowed) for priced lines, where allowed is the
+        fee's max_allowed if the claim has a `justification`. Lines with no
+        fee for the claim's plan are paid at billed and marked
+        "priced": False with the reason.
+        """
+        n = len(claims)
+        claim_of_line, plan_of_line, code_of_line, billed_list, codes_flat = [], [], [], [], []
+        claim_plans, justified_list = [], []
+        for i, claim in enumerate(claims):
+            plan = self._plan_for(claim.get("plan_type"))
+            claim_plans.append(plan)
+            justified_list.append(bool(str(claim.get("justification") or "").strip()))
+            codes = [str(c).strip() for c in claim.get("procedure_codes", [])]
+            line_amounts = claim.get("line_amounts") or []
+            for j, code in enumerate(codes):
+                claim_of_line.append(i)
+                plan_of_line.append(plan)
+                code_of_line.append(self.code_index.get(code, -1))
+                billed_list.append(float(line_amounts[j]) if j < len(line_amounts) else np.nan)
+                codes_flat.append(code)
+
+        claim_of_line = np.asarray(claim_of_line, dtype=np.int64)
+        plan_of_line = np.asarray(plan_of_line, dtype=np.int64)
+        code_of_line = np.asarray(code_of_line, dtype=np.int64)
+        billed = np.asarray(billed_list, dtype=np.float64)
+
+        known = (plan_of_line >= 0) & (code_of_line >= 0)
+        allowed = np.full(len(billed), np.nan)
+        allowed[known] = self.allowed[plan_of_line[known], code_of_line[known]]
+        max_allowed = np.full(len(billed), np.nan)
+        max_allowed[known] = self.max_allowed[plan_of_line[known], code_of_line[known]]
+        priced = ~np.isnan(allowed)
+        justified = np.asarray(justified_list, dtype=bool)[claim_of_line]
+        cap = np.where(justified, max_allowed, allowed)
+
+        # Allocate claim_amount to lines without an explicit billed amount
+        missing = np.isnan(billed)
+        if missing.any():
+            claim_amounts = np.array([float(c.get("claim_amount", 0) or 0) for c in claims])
+            explicit_total = np.bincount(claim_of_line[~missing], weights=billed[~missing], minlength=n)
+            remainder = np.maximum(claim_amounts - explicit_total, 0.0)
+
+            weight = np.where(priced, allowed, 0.0) * missing
+            weight_total = np.bincount(claim_of_line, weights=weight, minlength=n)[claim_of_line]
+            missing_count = np.bincount(claim_of_line, weights=missing.astype(np.float64), minlength=n)
+            unpriced_count = np.bincount(claim_of_line, weights=(missing & ~priced).astype(np.float64), minlength=n)
+            even = missing / np.maximum(missing_count[claim_of_line], 1.0)
+            proportional = unpriced_count[claim_of_line] == 0
+            share = np.where(proportional, weight / np.where(weight_total > 0, weight_total, 1.0), even)
+            billed = np.where(missing, remainder[claim_of_line] * share, billed)
+
+        paid = np.where(priced, np.minimum(billed, np.nan_to_num(cap)), billed)
+
+        total_billed = np.bincount(claim_of_line, weights=billed, minlength=n)
+        total_allowed = np.bincount(claim_of_line, weights=np.where(priced, cap, billed), minlength=n)
+        total_paid = np.bincount(claim_of_line, weights=paid, minlength=n)
+        unpriced = np.bincount(claim_of_line, weights=(~priced).astype(np.float64), minlength=n)
+
+        results = [
+            {
+                "fee_schedule_plan": self.plan_names[claim_plans[i]] if claim_plans[i] >= 0 else None,
+                "lines": [],
+                "total_billed": round(float(total_billed[i]), 2),
+                "total_allowed": round(float(total_allowed[i]), 2),
+                "total_paid": round(float(total_paid[i]), 2),
+                "justified": justified_list[i],
+                "unpriced_lines": int(unpriced[i])
+            }
+            for i in range(n)
+        ]
+        for k in range(len(billed)):
+            line = {
+                "procedure_code": codes_flat[k],
+                "billed": round(float(billed[k]), 2),
+                "allowed": round(float(cap[k]), 2) if priced[k] else None,
+                "standard_allowed": round(float(allowed[k]), 2) if priced[k] else None,
+                "max_allowed": round(float(max_allowed[k]), 2) if priced[k] else None,
+                "paid": round(float(paid[k]), 2),
+                "priced": bool(priced[k])
+            }
+            if not priced[k]:
+                plan = claim_plans[claim_of_line[k]]
+                line["reason"] = (
+                    f"No fee for {codes_flat[k]} under {self.plan_names[plan]}; paid at billed"
+                    if plan >= 0 else "No fee schedule for the claim's plan; paid at billed"
+                )
+            results[claim_of_line[k]]["lines"].append(line)
+        return results
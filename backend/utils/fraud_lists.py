@@ -0,0 +1,64 @@
+# backend/utils/fraud_lists.py
+"""
+Precompiled fraud_rules.json lists: suspicious procedure combinations,
+high-risk provider watchlist and per-claim procedure limit
+"""
+import os
+from itertools import combinations
+from typing import Dict, Any, List, Tuple
+
+from .bloom_filter import BloomFilter
+
+
+def _normalize_provider(value) -> str:
+    return str(value or "").strip().lower()
+
+
+class ProviderWatchlist:
+    """
+    Exact frozenset for normal-sized lists; past `bloom_threshold` entries
+    a Bloom filter keeps memory flat (at a small false-positive rate)
+    """
+    def __init__(self, providers: List[str], bloom_threshold: int = None):
+        if bloom_threshold is None:
+            bloom_threshold = int(os.getenv("WATCHLIST_BLOOM_THRESHOLD", "1000000"))
+        normalized = [_normalize_provider(p) for p in providers if _normalize_provider(p)]
+        self.probabilistic = len(normalized) > bloom_threshold
+        if self.probabilistic:
+            self.members = BloomFilter(len(normalized))
+            for p in normalized:
+                self.members.add(p)
+        else:
+            self.members = frozenset(normalized)
+
+    def match(self, claim_data: dict):
+        """The claim's provider identifier found on the watchlist, if any"""
+        for field in ("provider_id", "provider_name"):
+            value = _normalize_provider(claim_data.get(field))
+            if value and value in self.members:
+                return claim_data.get(field)
+        return None
+
+    def __len__(self):
+        return len(self.members)
+
+
+class CompiledFraudLists:
+    def __init__(self, rules: Dict[str, Any]):
+        self.combinations = frozenset(
+            tuple(sorted(str(c).strip() for c in combo))
+            for combo in rules.get("suspicious_procedure_combinations", [])
+            if len(combo) == 2
+        )
+        self.watchlist = ProviderWatchlist(rules.get("high_risk_providers", []))
+        self.max_procedures = int(rules.get("red_flags", {}).get("max_procedures_per_claim", 0)) or None
+
+    def suspicious_pairs(self, procedure_codes) -> List[Tuple[str, str]]:
+        """Listed pairs present on the claim; cost depends on claim size only"""
+        if not self.combinations:
+            return []
+        codes = sorted({str(c).strip() for c in procedure_codes})
+        return [pair for pair in combinations(codes, 2) if pair in self.combinations]
+
+    def too_many_procedures(self, procedure_codes) -> bool:
+        return self.max_procedures is not None and len(procedure_codes) > self.max_procedures
@@ -0,0 +1,265 @@
+# backend/utils/fraud_model.py
+"""
+Local learned fraud scorer (L2-regularized logistic regression in NumPy).
+
+Features are the per-rule risk contributions from the fraud rule engine
+plus a few claim-shape values; they are written to
+logs/claims_processing.log with every processed claim. The model is trained
+offline from that log and a file of labeled outcomes, and stored as JSON
+(feature names, standardization, weights and the uncertainty band).
+Scoring is a few multiply-adds per claim, vectorized over claims in batches.
+
+    python -m backend.utils.fraud_model train --labels labels.jsonl
+    python -m backend.utils.fraud_model evaluate --labels labels.jsonl
+
+Labels are JSONL ({"claim_id": ..., "fraud": 0/1}) or CSV with those columns.
+"""
+import os
+import csv
+import json
+import math
+import argparse
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_MODEL_PATH = Path(__file__).parent.parent.parent / "state" / "fraud_model.json"
+
+
+def fraud_model_path() -> Path:
+    return Path(os.getenv("FRAUD_MODEL_PATH", str(DEFAULT_MODEL_PATH)))
+
+
+def claim_features(fired, claim_data: dict) -> Dict[str, float]:
+    """Feature dict for one claim from the rule engine's fired (rule_id, contribution, flag) list"""
+    features = {}
+    for rule_id, contribution, _ in fired:
+        key = f"rule:{rule_id}"
+        features[key] = features.get(key, 0.0) + contribution
+    try:
+        amount = float(claim_data.get("claim_amount", 0) or 0)
+    except (TypeError, ValueError):
+        amount = 0.0
+    features["log_amount"] = math.log1p(max(amount, 0.0))
+    features["n_procedures"] = float(len(claim_data.get("procedure_codes", []) or []))
+    features["n_diagnoses"] = float(len(claim_data.get("diagnosis_codes", []) or []))
+    return features
+
+
+class LogisticFraudModel:
+    def __init__(self, feature_names: List[str], weights, bias: float, mean, scale,
+                 low: float = 0.2, high: float = 0.8):
+        self.feature_names = list(feature_names)
+        self.index = {name: i for i, name in enumerate(self.feature_names)}
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.bias = float(bias)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        # Scores inside (low, high) are uncertain and still go to the LLM
+        self.low = float(low)
+        self.high = float(high)
+        # Fold standardization into the weights so scoring needs no extra pass
+        self._w = self.weights / self.scale
+        self._b = self.bias - float(self.mean @ self._w)
+        self._w_list = self._w.tolist()
+
+    def vectorize(self, feature_dicts: List[Dict[str, float]]) -> np.ndarray:
+        X = np.zeros((len(feature_dicts), len(self.feature_names)))
+        for row, features in enumerate(feature_dicts):
+            for name, value in features.items():
+                col = self.index.get(name)
+                if col is not None:
+                    X[row, col] = value
+        return X
+
+    # score() and score_batch() add the terms in the same (column) order, so a
+    # claim gets bit-identical probabilities whichever path scores it
+
+    def score_batch(self, X: np.ndarray) -> np.ndarray:
+        """Fraud probabilities for a (claims x features) matrix"""
+        z = np.full(len(X), self._b)
+        for col, weight in enumerate(self._w_list):
+            z += X[:, col] * weight
+        return 1.0 / (1.0 + np.exp(-z))
+
+    def score(self, features: Dict[str, float]) -> float:
+        z = self._b
+        for name, weight in zip(self.feature_names, self._w_list):
+            value = features.get(name)
+            if value:
+                z += value * weight
+        return float(1.0 / (1.0 + np.exp(-np.array([z])))[0])
+
+    def band(self, probability: float) -> str:
+        if probability >= self.high:
+            return "FRAUD"
+        if probability <= self.low:
+            return "CLEAR"
+        return "UNCERTAIN"
+
+    @classmethod
+    def train(cls, feature_dicts: List[Dict[str, float]], labels, l2: float = 1.0,
+              iterations: int = 25, low: float = 0.2, high: float = 0.8) -> "LogisticFraudModel":
+        """Fit with Newton's method (IRLS); features are few, so each step is a small solve"""
+        feature_names = sorted({name for f in feature_dicts for name in f})
+        model = cls(feature_names, np.zeros(len(feature_names)), 0.0,
+                    np.zeros(len(feature_names)), np.ones(len(feature_names)), low, high)
+        X = model.vectorize(feature_dicts)
+        y = np.asarray(labels, dtype=np.float64)
+
+        mean = X.mean(axis=0)
+        scale = X.std(axis=0)
+        scale[scale == 0] = 1.0
+        Z = np.hstack([(X - mean) / scale, np.ones((len(X), 1))])
+
+        theta = np.zeros(Z.shape[1])
+        penalty = np.full(Z.shape[1], l2)
+        penalty[-1] = 0.0  # no penalty on the bias
+        for _ in range(iterations):
+            p = 1.0 / (1.0 + np.exp(-(Z @ theta)))
+            gradient = Z.T @ (p - y) + penalty * theta
+            hessian = (Z * (p * (1 - p))[:, None]).T @ Z + np.diag(penalty) + 1e-9 * np.eye(Z.shape[1])
+            step = np.linalg.solve(hessian, gradient)
+            theta -= step
+            if np.abs(step).max() < 1e-8:
+                break
+
+        return cls(feature_names, theta[:-1], theta[-1], mean, scale, low, high)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "feature_names": self.feature_names,
+            "weights": self.weights.tolist(),
+            "bias": self.bias,
+            "mean": self.mean.tolist(),
+            "scale": self.scale.tolist(),
+            "low": self.low,
+            "high": self.high,
+        }
+
+    def save(self, path: Path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(self.to_dict(), indent=2))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "LogisticFraudModel":
+        return cls(**json.loads(Path(path).read_text()))
+
+
+def load_fraud_model(path: Optional[Path] = None) -> Optional[LogisticFraudModel]:
+    """The trained model, or None when no model has been trained yet"""
+    path = Path(path) if path else fraud_model_path()
+    if not path.exists():
+        return None
+    try:
+        model = LogisticFraudModel.load(path)
+    except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+        print(f"❌ Could not load fraud model {path}: {e}")
+        return None
+    print(f"Fraud model loaded: {len(model.feature_names)} features")
+    return model
+
+
+def load_labels(path: Path) -> Dict[str, int]:
+    path = Path(path)
+    labels = {}
+    if path.suffix.lower() == ".csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+    else:
+        rows = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines() if line.strip()]
+    for row in rows:
+        value = str(row["fraud"]).strip().lower()
+        labels[str(row["claim_id"])] = 1 if value in ("1", "true", "yes", "fraud") else 0
+    return labels
+
+
+def load_training_data(log_path: Path, labels: Dict[str, int]) -> Tuple[List[Dict[str, float]], List[int]]:
+    """Labeled feature rows from the claims log (latest entry wins per claim)"""
+    latest = {}
+    for line in Path(log_path).read_text(encoding="utf-8").splitlines():
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        features = entry.get("fraud_features")
+        if features and entry.get("claim_id") in labels:
+            latest[entry["claim_id"]] = features
+    claim_ids = sorted(latest)
+    return [latest[c] for c in claim_ids], [labels[c] for c in claim_ids]
+
+
+def evaluate(model: LogisticFraudModel, feature_dicts, labels) -> Dict[str, Any]:
+    y = np.asarray(labels)
+    p = model.score_batch(model.vectorize(feature_dicts))
+    predicted = p >= 0.5
+    tp = int(np.sum(predicted & (y == 1)))
+    fp = int(np.sum(predicted & (y == 0)))
+    fn = int(np.sum(~predicted & (y == 1)))
+
+    # ROC AUC from ranks (ties averaged)
+    positives, negatives = int(y.sum()), int(len(y) - y.sum())
+    auc = None
+    if positives and negatives:
+        order = np.argsort(p, kind="mergesort")
+        ranks = np.empty(len(p))
+        ranks[order] = np.arange(1, len(p) + 1)
+        for value in np.unique(p):
+            tied = p == value
+            ranks[tied] = ranks[tied].mean()
+        auc = round(float((ranks[y == 1].sum() - positives * (positives + 1) / 2) / (positives * negatives)), 4)
+
+    uncertain = (p > model.low) & (p < model.high)
+    return {
+        "claims": int(len(y)),
+        "fraud_rate": round(float(y.mean()), 4) if len(y) else 0.0,
+        "auc": auc,
+        "accuracy": round(float(np.mean(predicted == (y == 1))), 4) if len(y) else 0.0,
+        "precision": round(tp / (tp + fp), 4) if tp + fp else 0.0,
+        "recall": round(tp / (tp + fn), 4) if tp + fn else 0.0,
+        "uncertain_share": round(float(uncertain.mean()), 4) if len(y) else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train or evaluate the local fraud scorer")
+    parser.add_argument("command", choices=["train", "evaluate"])
+    parser.add_argument("--log", default="logs/claims_processing.log")
+    parser.add_argument("--labels", required=True, help="JSONL or CSV with claim_id and fraud columns")
+    parser.add_argument("--model", default=str(fraud_model_path()))
+    parser.add_argument("--holdout", type=float, default=0.2, help="share of claims held out for evaluation")
+    parser.add_argument("--l2", type=float, default=1.0)
+    parser.add_argument("--low", type=float, default=0.2)
+    parser.add_argument("--high", type=float, default=0.8)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    features, labels = load_training_data(args.log, load_labels(args.labels))
+    if not features:
+        raise SystemExit("No labeled claims with fraud_features found in the log")
+
+    if args.command == "evaluate":
+        model = LogisticFraudModel.load(args.model)
+        print(json.dumps(evaluate(model, features, labels), indent=2))
+        return
+
+    order = np.random.default_rng(args.seed).permutation(len(features))
+    n_test = int(len(features) * args.holdout)
+    test, train = order[:n_test], order[n_test:]
+    model = LogisticFraudModel.train([features[i] for i in train], [labels[i] for i in train],
+                                     l2=args.l2, low=args.low, high=args.high)
+    if n_test:
+        print("Holdout:", json.dumps(evaluate(model, [features[i] for i in test], [labels[i] for i in test]), indent=2))
+
+    # Refit on everything before saving
+    model = LogisticFraudModel.train(features, labels, l2=args.l2, low=args.low, high=args.high)
+    model.save(args.model)
+    print(f"Saved fraud model ({len(features)} claims, {len(model.feature_names)} features) to {args.model}")
+
+
+if __name__ == "__main__":
+    main()
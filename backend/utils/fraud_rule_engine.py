@@ -0,0 +1,439 @@
+# backend/utils/fraud_rule_engine.py
+"""
+Declarative fraud rules (data/fraud_rule_set.json) compiled to closures.
+
+Each rule entry is compiled once into a closure: regexes are precompiled,
+all keywords share one overlapping-match regex so the claim text is scanned
+once, and thresholds/weights are bound as constants. Stateful checks
+(duplicates, running statistics, ...) are declared as "builtin" rules whose
+implementation is supplied by FraudDetectionAgent, so their weights and
+order also live in the file. Builtins are called as check(claim,
+update_state); with update_state=False they only query their state.
+
+The rule file is re-read when it changes, so rules can be tuned without
+a deploy.
+"""
+import re
+import json
+import time
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Callable, Tuple
+
+import numpy as np
+
+from .columnar import flatten
+from .monitoring import Histogram, CONTRIBUTION_BUCKETS
+
+DEFAULT_RULE_SET_PATH = Path(__file__).parent.parent / "data" / "fraud_rule_set.json"
+
+# A compiled rule returns the (contribution, flag) pairs it fired
+Evaluator = Callable[[dict, Dict[str, Any]], List[Tuple[float, str]]]
+# Its batch form returns layers of (claim rows, contribution(s), flag or per-row flags);
+# within a claim, layers come in the order the single-claim rule emits its hits
+BatchEvaluator = Callable[[List[dict], List[Dict[str, Any]]], List[Tuple[np.ndarray, Any, Any]]]
+
+
+# Each rule type is parsed once into shared parts (tier table, keyword regex,
+# ...); the per-claim and batch evaluators are both built from those parts
+def _parse_amount_tiers(rule):
+    field = rule.get("field", "claim_amount")
+    # Highest threshold first: a claim only takes its top tier
+    tiers = sorted(((float(t["gt"]), float(t["weight"]), t["flag"]) for t in rule["tiers"]), reverse=True)
+    return field, tiers
+
+
+def _parse_keywords(rule):
+    keywords = [k.lower() for k in rule["keywords"]]
+    # Zero-width lookahead finds every (even overlapping) keyword in one scan
+    automaton = re.compile("(?=(" + "|".join(re.escape(k) for k in sorted(keywords, key=len, reverse=True)) + "))")
+    # Only the longest keyword is reported per position; it implies the ones it contains
+    implied = {k: frozenset(other for other in keywords if other in k) for k in keywords}
+    return keywords, automaton, implied, float(rule["weight"]), rule["flag"]
+
+
+def _parse_field_weight_flag(rule):
+    return rule["field"], float(rule["weight"]), rule["flag"]
+
+
+def _parse_text_cases(rule):
+    cases = []
+    for case in rule["cases"]:
+        cases.append((
+            frozenset(v.lower() for v in case.get("empty_or_equals", [])) if "empty_or_equals" in case else None,
+            tuple(v.lower() for v in case.get("contains", [])),
+            float(case["weight"]),
+            case["flag"]
+        ))
+    return rule["field"], cases
+
+
+def _parse_code_format(rule):
+    return rule["field"], re.compile(rule["pattern"]), float(rule["weight"]), rule["flag"]
+
+
+def _parse_multiple_of(rule):
+    return rule.get("field", "claim_amount"), float(rule["value"]), float(rule["weight"]), rule["flag"]
+
+
+def _compile_amount_tiers(parts) -> Evaluator:
+    field, tiers = parts
+
+    def evaluate(claim, ctx):
+        amount = claim.get(field, 0)
+        for threshold, weight, flag in tiers:
+            if amount > threshold:
+                return [(weight, flag)]
+        return []
+    return evaluate
+
+
+def _compile_keywords(parts) -> Evaluator:
+    keywords, automaton, implied, weight, flag = parts
+
+    def evaluate(claim, ctx):
+        text = ctx.get("claim_text")
+        if text is None:
+            text = ctx["claim_text"] = str(claim).lower()
+        found = set()
+        for m in automaton.finditer(text):
+            found |= implied[m.group(1)]
+        return [(weight, flag.format(keyword=k)) for k in keywords if k in found]
+    return evaluate
+
+
+def _compile_missing(parts) -> Evaluator:
+    field, weight, flag = parts
+
+    def evaluate(claim, ctx):
+        return [(weight, flag)] if not claim.get(field, []) else []
+    return evaluate
+
+
+def _compile_duplicates(parts) -> Evaluator:
+    field, weight, flag = parts
+
+    def evaluate(claim, ctx):
+        values = claim.get(field, [])
+        return [(weight, flag)] if len(values) != len(set(values)) else []
+    return evaluate
+
+
+def _compile_text_cases(parts) -> Evaluator:
+    field, cases = parts
+
+    def evaluate(claim, ctx):
+        value = claim.get(field, "")
+        lowered = value.lower() if value else ""
+        for equals, contains, weight, flag in cases:
+            if equals is not None and (not value or lowered in equals):
+                return [(weight, flag)]
+            if contains and any(c in lowered for c in contains):
+                return [(weight, flag)]
+        return []
+    return evaluate
+
+
+def _compile_code_format(parts) -> Evaluator:
+    field, pattern, weight, flag = parts
+
+    def evaluate(claim, ctx):
+        return [(weight, flag.format(code=code)) for code in claim.get(field, []) if not pattern.match(str(code))]
+    return evaluate
+
+
+def _compile_multiple_of(parts) -> Evaluator:
+    field, value, weight, flag = parts
+
+    def evaluate(claim, ctx):
+        amount = claim.get(field, 0)
+        return [(weight, flag)] if amount > 0 and amount % value == 0 else []
+    return evaluate
+
+
+def _batch_from_evaluator(evaluate: Evaluator) -> BatchEvaluator:
+    """Run a per-claim rule over the batch (in claim order) and regroup its hits into layers"""
+    def evaluate_batch(claims, ctxs):
+        fired = [evaluate(claim, ctx) for claim, ctx in zip(claims, ctxs)]
+        layers = []
+        for k in range(max(map(len, fired), default=0)):
+            rows = [i for i, hits in enumerate(fired) if len(hits) > k]
+            layers.append((
+                np.array(rows, dtype=np.int64),
+                np.array([fired[i][k][0] for i in rows]),
+                [fired[i][k][1] for i in rows]
+            ))
+        return layers
+    return evaluate_batch
+
+
+def _amounts(claims, field) -> np.ndarray:
+    return np.array([claim.get(field, 0) for claim in claims], dtype=np.float64)
+
+
+def _batch_amount_tiers(parts) -> BatchEvaluator:
+    field, tiers = parts
+
+    def evaluate_batch(claims, ctxs):
+        amount = _amounts(claims, field)
+        assigned = np.zeros(len(claims), dtype=bool)
+        layers = []
+        for threshold, weight, flag in tiers:
+            hit = (amount > threshold) & ~assigned
+            assigned |= hit
+            layers.append((np.flatnonzero(hit), weight, flag))
+        return layers
+    return evaluate_batch
+
+
+def _layers_by_rank(hits: np.ndarray, owners: np.ndarray, weight: float, flags: list):
+    """Split per-item hits (in claim order) into layers: each claim's 1st hit, 2nd hit, ..."""
+    if not len(hits):
+        return []
+    hit_owners = owners[hits]
+    starts = np.r_[0, np.flatnonzero(np.diff(hit_owners)) + 1]
+    rank = np.arange(len(hits)) - np.repeat(starts, np.diff(np.r_[starts, len(hits)]))
+    layers = []
+    for k in range(int(rank.max()) + 1):
+        at = np.flatnonzero(rank == k)
+        layers.append((hit_owners[at], weight, [flags[i] for i in at.tolist()]))
+    return layers
+
+
+def _batch_keywords(parts) -> BatchEvaluator:
+    keywords, automaton, implied, weight, flag = parts
+    order = {k: i for i, k in enumerate(keywords)}
+
+    def evaluate_batch(claims, ctxs):
+        # One scan over the whole batch; NUL never occurs in a repr'd dict, so no match spans two claims
+        texts = [str(claim).lower() for claim in claims]
+        ends = np.cumsum([len(t) + 1 for t in texts])
+        matches = [(m.start(), m.group(1)) for m in automaton.finditer("\0".join(texts))]
+        if not matches:
+            return []
+        starts, matched = zip(*matches)
+        owners = np.searchsorted(ends, starts, "right").tolist()
+        found = {(owner, order[k]) for owner, key in zip(owners, matched) for k in implied[key]}
+        pairs = np.array(sorted(found), dtype=np.int64)
+        hits = np.arange(len(pairs))
+        return _layers_by_rank(hits, pairs[:, 0], weight, [flag.format(keyword=keywords[i]) for i in pairs[:, 1].tolist()])
+    return evaluate_batch
+
+
+def _batch_code_format(parts) -> BatchEvaluator:
+    field, pattern, weight, flag = parts
+
+    def evaluate_batch(claims, ctxs):
+        values, owners = flatten([claim.get(field, []) for claim in claims])
+        if not values:
+            return []
+        # Codes repeat heavily across claims: match each distinct code once
+        texts = [str(v) for v in values]
+        valid = {t: bool(pattern.match(t)) for t in set(texts)}
+        hits = np.flatnonzero(~np.array([valid[t] for t in texts], dtype=bool))
+        return _layers_by_rank(hits, owners, weight, [flag.format(code=values[i]) for i in hits.tolist()])
+    return evaluate_batch
+
+
+def _batch_missing(parts) -> BatchEvaluator:
+    field, weight, flag = parts
+
+    def evaluate_batch(claims, ctxs):
+        missing = np.array([not claim.get(field, []) for claim in claims], dtype=bool)
+        return [(np.flatnonzero(missing), weight, flag)]
+    return evaluate_batch
+
+
+def _batch_duplicates(parts) -> BatchEvaluator:
+    field, weight, flag = parts
+
+    def evaluate_batch(claims, ctxs):
+        values, owners = flatten([claim.get(field, []) for claim in claims])
+        if not values:
+            return []
+        # Dict ids give the same equality semantics as set()
+        ids = {}
+        codes = np.array([ids.setdefault(v, len(ids)) for v in values], dtype=np.int64)
+        distinct_owners = np.unique(owners * len(ids) + codes) // len(ids)
+        lengths = np.bincount(owners, minlength=len(claims))
+        distinct = np.bincount(distinct_owners, minlength=len(claims))
+        return [(np.flatnonzero(lengths != distinct), weight, flag)]
+    return evaluate_batch
+
+
+def _batch_text_cases(parts) -> BatchEvaluator:
+    field, cases = parts
+
+    def evaluate_batch(claims, ctxs):
+        values = [claim.get(field, "") for claim in claims]
+        empty = np.array([not v for v in values], dtype=bool)
+        lowered = np.char.lower(np.array([v if v else "" for v in values], dtype=str))
+        assigned = np.zeros(len(claims), dtype=bool)
+        layers = []
+        for equals, contains, weight, flag in cases:
+            hit = np.zeros(len(claims), dtype=bool)
+            if equals is not None:
+                hit |= empty | np.isin(lowered, list(equals))
+            for c in contains:
+                hit |= np.char.find(lowered, c) >= 0
+            hit &= ~assigned
+            assigned |= hit
+            layers.append((np.flatnonzero(hit), weight, flag))
+        return layers
+    return evaluate_batch
+
+
+def _batch_multiple_of(parts) -> BatchEvaluator:
+    field, value, weight, flag = parts
+
+    def evaluate_batch(claims, ctxs):
+        amount = _amounts(claims, field)
+        return [(np.flatnonzero((amount > 0) & (np.remainder(amount, value) == 0)), weight, flag)]
+    return evaluate_batch
+
+
+# rule type -> (parse, per-claim compiler, batch compiler); builtins are compiled by CompiledRuleSet
+RULE_TYPES = {
+    "amount_tiers": (_parse_amount_tiers, _compile_amount_tiers, _batch_amount_tiers),
+    "keywords": (_parse_keywords, _compile_keywords, _batch_keywords),
+    "missing": (_parse_field_weight_flag, _compile_missing, _batch_missing),
+    "duplicates": (_parse_field_weight_flag, _compile_duplicates, _batch_duplicates),
+    "text_cases": (_parse_text_cases, _compile_text_cases, _batch_text_cases),
+    "code_format": (_parse_code_format, _compile_code_format, _batch_code_format),
+    "multiple_of": (_parse_multiple_of, _compile_multiple_of, _batch_multiple_of),
+}
+
+
+class CompiledRuleSet:
+    def __init__(self, spec: Dict[str, Any], builtins: Dict[str, Callable[[dict, bool], List[str]]]):
+        self.version = spec.get("version", "")
+        self.rules = []
+        for rule in spec.get("rules", []):
+            if not rule.get("enabled", True):
+                continue
+            rule_id = rule["id"]
+            if rule["type"] == "builtin":
+                evaluator = self._compile_builtin(rule, builtins[rule_id])
+                batch_evaluator = _batch_from_evaluator(evaluator)
+            else:
+                parse, compile_rule, compile_batch = RULE_TYPES[rule["type"]]
+                parts = parse(rule)
+                evaluator, batch_evaluator = compile_rule(parts), compile_batch(parts)
+            self.rules.append((rule_id, evaluator, batch_evaluator))
+
+    @staticmethod
+    def _compile_builtin(rule, check) -> Evaluator:
+        weight = float(rule["weight"])
+        per_hit = rule.get("per_hit", False)
+
+        def evaluate(claim, ctx):
+            flags = check(claim, ctx.get("update_state", True))
+            if not flags:
+                return []
+            if per_hit:
+                return [(weight, f) for f in flags]
+            # One contribution for the rule, however many flags it explains
+            return [(weight, flags[0])] + [(0.0, f) for f in flags[1:]]
+        return evaluate
+
+    def evaluate(self, claim_data: dict, update_state: bool = True) -> List[Tuple[str, float, str]]:
+        """All fired (rule_id, contribution, flag) triples, in rule order"""
+        ctx = {"update_state": update_state}
+        fired = []
+        for rule_id, evaluator, _ in self.rules:
+            for contribution, flag in evaluator(claim_data, ctx):
+                fired.append((rule_id, contribution, flag))
+        return fired
+
+    def evaluate_batch(self, claims: List[dict], update_state: bool = True) -> List[Tuple[str, np.ndarray, Any, Any]]:
+        """All (rule_id, rows, contribution(s), flag(s)) layers, in rule order"""
+        ctxs = [{"update_state": update_state} for _ in claims]
+        layers = []
+        for rule_id, _, batch_evaluator in self.rules:
+            for rows, contribution, flags in batch_evaluator(claims, ctxs):
+                if len(rows):
+                    layers.append((rule_id, rows, contribution, flags))
+        return layers
+
+
+class FraudRuleEngine:
+    """
+    Owns the compiled rule set, recompiling when the rule file changes
+    (checked at most every `check_interval` seconds), and counts rule hits
+    by final risk level with a contribution histogram per rule.
+    These counts are the one source of per-rule metrics (/metrics, Prometheus).
+    """
+    def __init__(self, builtins: Dict[str, Callable[[dict, bool], List[str]]],
+                 path: Path = DEFAULT_RULE_SET_PATH, check_interval: float = 5.0):
+        self.path = Path(path)
+        self.builtins = builtins
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.hit_counts = {}     # rule -> risk level -> claims
+        self.contributions = {}  # rule -> Histogram of its contribution per claim
+        self._signature = None
+        self._next_check = 0.0
+        self.compiled = CompiledRuleSet({}, builtins)
+        self._maybe_reload(force=True)
+
+    def _maybe_reload(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        try:
+            st = self.path.stat()
+            signature = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            signature = None
+        if signature == self._signature:
+            return
+        try:
+            spec = json.loads(self.path.read_text()) if signature else {}
+            self.compiled = CompiledRuleSet(spec, self.builtins)
+            self._signature = signature
+        except (json.JSONDecodeError, KeyError, re.error) as e:
+            # Keep the previous rule set if the edited file is broken
+            print(f"❌ Invalid fraud rule set {self.path}: {e}")
+            self._signature = signature
+
+    def evaluate(self, claim_data: dict, update_state: bool = True) -> List[Tuple[str, float, str]]:
+        """Fired rules for one claim (hits are counted by record_hits once the risk level is final)"""
+        self._maybe_reload()
+        return self.compiled.evaluate(claim_data, update_state)
+
+    def evaluate_batch(self, claims: List[dict], update_state: bool = True) -> List[Tuple[str, np.ndarray, Any, Any]]:
+        self._maybe_reload()
+        return self.compiled.evaluate_batch(claims, update_state)
+
+    def record_hits(self, fired_per_claim: List[List[Tuple[str, float, str]]], risk_levels: List[str]):
+        """
+        Count each claim's fired rules under the claim's final risk level, and
+        each rule's total contribution to that claim in its histogram
+        """
+        with self.lock:
+            for fired, level in zip(fired_per_claim, risk_levels):
+                contributions = {}
+                for rule_id, contribution, _ in fired:
+                    contributions[rule_id] = contributions.get(rule_id, 0.0) + contribution
+                for rule_id, contribution in contributions.items():
+                    levels = self.hit_counts.setdefault(rule_id, {})
+                    levels[level] = levels.get(level, 0) + 1
+                    if rule_id not in self.contributions:
+                        self.contributions[rule_id] = Histogram(CONTRIBUTION_BUCKETS)
+                    self.contributions[rule_id].observe(contribution)
+
+    def rule_stats(self) -> Dict[str, Any]:
+        """Per rule: claims it fired on (total and by risk level) and its contribution histogram"""
+        with self.lock:
+            return {
+                "version": self.compiled.version,
+                "rules": {
+                    rule_id: {
+                        "hits": sum(levels.values()),
+                        "by_level": dict(levels),
+                        "contribution": self.contributions[rule_id].snapshot()
+                    }
+                    for rule_id, levels in self.hit_counts.items()
+                }
+            }
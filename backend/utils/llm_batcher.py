@@ -0,0 +1,131 @@
+# backend/utils/llm_batcher.py
+"""
+Micro-batching queue for LLM calls.
+
+Requests are collected for up to `max_wait_ms` or `max_batch` items,
+whichever comes first, and handed to `process_batch` as one list. Each
+caller gets a Future resolved with its own entry of the returned list, so
+a burst of N requests costs one model round trip instead of N.
+
+Up to `max_in_flight` batches run at once, so one slow model call doesn't
+hold up every claim queued behind it; while all of them are busy, new
+requests keep accumulating into the next batch.
+"""
+import time
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Any
+
+_STOP = object()
+
+
+class MicroBatcher:
+    def __init__(self, process_batch: Callable[[List[Any]], List[Any]],
+                 max_batch: int = 8, max_wait_ms: float = 50, max_in_flight: int = 2,
+                 name: str = "llm-batcher"):
+        self.process_batch = process_batch
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.queue = queue.Queue()
+        self.batches = 0
+        self.items = 0
+        self.lock = threading.Lock()
+        self.closed = False
+        self.slots = threading.Semaphore(self.max_in_flight)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix=name)
+        self.worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self.worker.start()
+
+    def submit(self, item: Any) -> Future:
+        future = Future()
+        with self.lock:
+            if self.closed:
+                future.set_exception(RuntimeError("LLM batcher is shut down"))
+                return future
+            self.queue.put((item, future))
+        return future
+
+    def shutdown(self, wait: bool = True):
+        """Stop batching; requests still queued fail, running batches finish"""
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.queue.put(_STOP)
+        self.worker.join()
+        self.executor.shutdown(wait=wait)
+
+    def _collect(self):
+        first = self.queue.get()
+        if first is _STOP:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                entry = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                self.queue.put(_STOP)
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self):
+        while True:
+            # Wait for a free slot first, so requests arriving meanwhile join the next batch
+            while not self.slots.acquire(timeout=0.1):
+                if self.closed:
+                    self._fail_queued([])
+                    return
+            batch = self._collect()
+            if self.closed:
+                self.slots.release()
+                self._fail_queued(batch)
+                return
+            self.executor.submit(self._process, batch)
+
+    def _fail_queued(self, batch):
+        while True:
+            try:
+                entry = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is not _STOP:
+                batch.append(entry)
+        error = RuntimeError("LLM batcher shut down before the request was sent")
+        for _, future in batch:
+            future.set_exception(error)
+
+    def _process(self, batch):
+        items = [item for item, _ in batch]
+        try:
+            results = self.process_batch(items)
+            if len(results) != len(items):
+                raise ValueError(f"expected {len(items)} results, got {len(results)}")
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        finally:
+            self.slots.release()
+        with self.lock:
+            self.batches += 1
+            self.items += len(items)
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "queued": self.queue.qsize(),
+            "max_in_flight": self.max_in_flight
+        }
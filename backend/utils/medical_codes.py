@@ -1,7 +1,14 @@
 # backend/utils/medical_codes.py
 """
 Medical Code Lookup Service for ICD-10 and CPT codes
+
+The tables below cover common codes. With an index built from the official
+files (python -m backend.utils.code_index icd10|cpt ...), every code is
+looked up by binary search in the memory-mapped index.
 """
+import threading
+
+from .code_index import open_code_index
 
 # Common ICD-10 codes with descriptions
 ICD10_DATABASE = {
@@ -85,6 +92,22 @@ CPT_DATABASE = {
     "00000": "Invalid procedure code",
 }
 
+_indexes = {}
+_index_lock = threading.Lock()
+
+
+def _code_index(kind):
+    """Index file for kind, opened once per process (built-in table if none)"""
+    index = _indexes.get(kind)
+    if index is None:
+        with _index_lock:
+            index = _indexes.get(kind)
+            if index is None:
+                fallback = ICD10_DATABASE if kind == "icd10" else CPT_DATABASE
+                index = _indexes[kind] = open_code_index(kind, fallback)
+    return index
+
+
 def get_icd10_description(code):
     """Get description for an ICD-10 code"""
     # Clean the code (remove trailing .0, etc.)
@@ -93,17 +116,20 @@ def get_icd10_description(code):
     # Try exact match first
     if clean_code in ICD10_DATABASE:
         return ICD10_DATABASE[clean_code]
+    index = _code_index("icd10")
+    description = index.get(clean_code)
+    if description is not None:
+        return description
     
-    # Try without decimal if present
-    if '.' in clean_code:
-        base_code = clean_code.split('.')[0]
-        if base_code in ICD10_DATABASE:
-            return ICD10_DATABASE[base_code]
+    # Try the parent codes (E11.65 -> E11.6 -> E11)
+    description = index.parent(clean_code)
+    if description is not None:
+        return description
     
     # Try to find partial matches (category level)
-    for stored_code, description in ICD10_DATABASE.items():
-        if stored_code.startswith(clean_code.split('.')[0]):
-            return f"{description} (category match)"
+    description = index.first_with_prefix(clean_code.split('.')[0])
+    if description is not None:
+        return f"{description} (category match)"
     
     return "ICD-10 code description not available"
 
@@ -114,6 +140,9 @@ def get_cpt_description(code):
     # Try exact match
     if clean_code in CPT_DATABASE:
         return CPT_DATABASE[clean_code]
+    description = _code_index("cpt").get(clean_code)
+    if description is not None:
+        return description
     
     # Try 5-digit format
     if len(clean_code) == 5 and clean_code.isdigit():
@@ -0,0 +1,79 @@
+# backend/utils/medical_necessity.py
+"""
+Diagnosis-to-procedure medical necessity table compiled into bitsets
+"""
+import json
+from pathlib import Path
+from typing import Dict, Any, List
+
+DEFAULT_MATRIX_PATH = Path(__file__).parent.parent / "data" / "medical_necessity.json"
+
+
+def _normalize_icd(code) -> str:
+    return str(code or "").strip().upper().replace(".", "")
+
+
+class MedicalNecessityMatrix:
+    """
+    The data file lists, per procedure, the ICD-10 prefixes that support it.
+    Procedures not listed are unrestricted.
+
+    At load time this is inverted into a sparse table of
+    ICD-10 prefix -> bitmask of supported procedures (one bit per restricted
+    procedure). A claim is then checked in one pass: OR the masks of every
+    prefix of every diagnosis, OR the bits of the billed procedures, and
+    `billed & ~supported` is the set of unsupported procedures.
+    """
+    def __init__(self, spec: Dict[str, Any]):
+        rules = spec.get("procedures", {})
+        self.procedure_bits = {}
+        self.procedure_codes = []
+        self.prefix_masks = {}
+
+        for bit, (procedure, prefixes) in enumerate(sorted(rules.items())):
+            self.procedure_bits[procedure] = 1 << bit
+            self.procedure_codes.append(procedure)
+            for prefix in prefixes:
+                key = _normalize_icd(prefix)
+                self.prefix_masks[key] = self.prefix_masks.get(key, 0) | (1 << bit)
+
+        self.max_prefix_len = max((len(k) for k in self.prefix_masks), default=0)
+
+    @classmethod
+    def from_file(cls, path: Path = DEFAULT_MATRIX_PATH) -> "MedicalNecessityMatrix":
+        path = Path(path)
+        return cls(json.loads(path.read_text()) if path.exists() else {})
+
+    def supported_mask(self, diagnosis_codes) -> int:
+        """Bitmask of restricted procedures supported by any of the diagnoses"""
+        mask = 0
+        masks = self.prefix_masks
+        for code in diagnosis_codes:
+            dx = _normalize_icd(code)
+            # Every ICD-10 category prefix of the code can contribute (J, J4, J45, J459...)
+            for length in range(1, min(len(dx), self.max_prefix_len) + 1):
+                mask |= masks.get(dx[:length], 0)
+        return mask
+
+    def unsupported_procedures(self, diagnosis_codes, procedure_codes) -> List[str]:
+        """Billed procedures that none of the claim's diagnoses support"""
+        billed = 0
+        for code in procedure_codes:
+            billed |= self.procedure_bits.get(str(code).strip(), 0)
+        if not billed:
+            return []
+
+        unsupported = billed & ~self.supported_mask(diagnosis_codes)
+        return [code for code in self.procedure_codes if unsupported & self.procedure_bits[code]]
+
+    def check(self, claim_data: dict) -> dict:
+        diagnosis_codes = claim_data.get("diagnosis_codes", [])
+        procedure_codes = claim_data.get("procedure_codes", [])
+
+        unsupported = self.unsupported_procedures(diagnosis_codes, procedure_codes)
+        if unsupported:
+            return {
+                "status": "NEEDS_REVIEW",
+                "reason": f"Procedure not medically necessary for diagnosis: {', '.join(unsupported)}"
+            }
+        return {"status": "PASSED", "reason": "Procedures supported by diagnoses"}
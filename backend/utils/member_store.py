@@ -0,0 +1,178 @@
+# backend/utils/member_store.py
+"""
+Pluggable member roster storage for eligibility checks.
+
+The JSON backend keeps the whole roster in memory (fine for small demos);
+the SQLite backend keeps it on disk behind a primary-key B-tree index, so
+each lookup is O(log n) and workers share the OS page cache instead of
+each holding a private copy.
+
+Convert a JSON roster into a SQLite store:
+    python -m backend.utils.member_store members.json members.db
+"""
+import os
+import json
+import sqlite3
+import argparse
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Optional, Dict, Any, Iterable, Tuple
+
+from .lru_cache import LRUCache
+from .eligibility_spans import CoverageSpans
+
+# Hot-cache marker for member_ids known to be absent
+_NOT_FOUND = object()
+
+
+class MemberStore(ABC):
+    """Base class: look up member records by member_id"""
+
+    def __init__(self, hot_cache_size: int = 4096):
+        self.hot = LRUCache(hot_cache_size)
+
+    def get(self, member_id: str) -> Optional[Dict[str, Any]]:
+        """Get a member record, serving repeat lookups from the hot LRU"""
+        return self.get_coverage(member_id)[0]
+
+    def get_coverage(self, member_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[CoverageSpans]]:
+        """
+        Get (record, coverage spans) for a member. The span index is built
+        once per lookup from the store and cached with the hot record.
+        """
+        cached = self.hot.get(member_id)
+        if cached is not None:
+            return (None, None) if cached is _NOT_FOUND else cached
+        record = self._lookup(member_id)
+        if record is None:
+            self.hot.put(member_id, _NOT_FOUND)
+            return None, None
+        entry = (record, CoverageSpans.from_record(record))
+        self.hot.put(member_id, entry)
+        return entry
+
+    def __contains__(self, member_id: str) -> bool:
+        return self.get(member_id) is not None
+
+    @abstractmethod
+    def is_empty(self) -> bool:
+        """True if the roster has no members (eligibility checks are then bypassed)"""
+
+    @abstractmethod
+    def _lookup(self, member_id: str) -> Optional[Dict[str, Any]]:
+        """The member's record from the backing store, or None"""
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": type(self).__name__, "hot_cache": self.hot.stats()}
+
+
+class JsonMemberStore(MemberStore):
+    """In-memory roster loaded from a JSON object keyed by member_id"""
+
+    def __init__(self, path: Path, hot_cache_size: int = 4096):
+        super().__init__(hot_cache_size)
+        path = Path(path)
+        self.members = json.loads(path.read_text()) if path.exists() else {}
+
+    def is_empty(self) -> bool:
+        return not self.members
+
+    def _lookup(self, member_id: str) -> Optional[Dict[str, Any]]:
+        return self.members.get(member_id)
+
+
+class SqliteMemberStore(MemberStore):
+    """On-disk roster indexed by member_id (read-only at runtime)"""
+
+    def __init__(self, path: Path, hot_cache_size: int = 4096):
+        super().__init__(hot_cache_size)
+        self.path = Path(path)
+        self._local = threading.local()
+        # The store is read-only at runtime and a reload opens a new one,
+        # so emptiness is checked once here rather than on every claim
+        self._empty = not self.path.exists() or \
+            self._conn().execute("SELECT 1 FROM members LIMIT 1").fetchone() is None
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections are not shareable across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            self._local.conn = conn
+        return conn
+
+    def is_empty(self) -> bool:
+        return self._empty
+
+    def _lookup(self, member_id: str) -> Optional[Dict[str, Any]]:
+        if not self.path.exists():
+            return None
+        row = self._conn().execute(
+            "SELECT record FROM members WHERE member_id = ?", (member_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+def member_store_path() -> Path:
+    """Roster location configured by MEMBER_STORE_PATH"""
+    default = Path(__file__).parent.parent / "data" / "members.json"
+    return Path(os.getenv("MEMBER_STORE_PATH", str(default)))
+
+
+def open_member_store(path=None) -> MemberStore:
+    """
+    Open the member store configured by MEMBER_STORE_PATH
+    (.db/.sqlite -> SQLite backend, anything else -> JSON backend)
+    """
+    path = Path(path) if path is not None else member_store_path()
+    hot_size = int(os.getenv("MEMBER_HOT_CACHE_SIZE", "4096"))
+    if path.suffix.lower() in (".db", ".sqlite", ".sqlite3"):
+        return SqliteMemberStore(path, hot_size)
+    return JsonMemberStore(path, hot_size)
+
+
+def import_roster(records: Iterable[Tuple[str, Dict[str, Any]]], db_path: Path, batch_size: int = 50000) -> int:
+    """Write (member_id, record) pairs into a fresh SQLite member store"""
+    db_path = Path(db_path)
+    tmp_path = db_path.with_suffix(db_path.suffix + ".tmp")
+    if tmp_path.exists():
+        tmp_path.unlink()
+
+    conn = sqlite3.connect(tmp_path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("CREATE TABLE members (member_id TEXT PRIMARY KEY, record TEXT NOT NULL) WITHOUT ROWID")
+
+    total = 0
+    batch = []
+    for member_id, record in records:
+        batch.append((str(member_id), json.dumps(record, separators=(",", ":"))))
+        if len(batch) >= batch_size:
+            conn.executemany("INSERT OR REPLACE INTO members VALUES (?, ?)", batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        conn.executemany("INSERT OR REPLACE INTO members VALUES (?, ?)", batch)
+        total += len(batch)
+    conn.commit()
+    conn.close()
+
+    # Swap in atomically so running workers never open a half-built store
+    os.replace(tmp_path, db_path)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a JSON member roster into an indexed SQLite store")
+    parser.add_argument("source", help="JSON roster: {member_id: {...}}")
+    parser.add_argument("target", help="SQLite file to create (replaced if it exists)")
+    args = parser.parse_args()
+
+    roster = json.loads(Path(args.source).read_text())
+    count = import_roster(roster.items(), Path(args.target))
+    print(f"Imported {count} members into {args.target}")
+
+
+if __name__ == "__main__":
+    main()
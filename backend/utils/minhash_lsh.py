@@ -0,0 +1,207 @@
+# backend/utils/minhash_lsh.py
+"""
+Near-duplicate claim documents via MinHash signatures and LSH banding.
+
+Claim text is normalized to word 3-gram shingles and reduced to a 64-value
+MinHash signature (one vectorized pass). The signature is split into 16
+bands of 4 rows; documents sharing any band hash are candidates, so a
+query looks at a handful of rows instead of the whole index. Candidates are
+confirmed with the 1-byte-per-value signature copy kept per document
+(b-bit MinHash), which estimates Jaccard similarity in 64 bytes.
+
+Storage is column-oriented NumPy: band hashes (tagged with their band
+number) live in one sorted array searched with a single vectorized
+searchsorted, plus a small dict for documents added since the last
+rebuild. Rows older than the window, or beyond `max_docs`, are
+dropped when the sorted arrays are rebuilt, which bounds memory at
+roughly 250 bytes per document. The rebuilt columns are snapshotted to
+disk; documents added since the last rebuild are not.
+"""
+import os
+import re
+import zlib
+import threading
+from datetime import date
+from pathlib import Path
+from typing import Optional, Dict, Any
+
+import numpy as np
+
+DEFAULT_INDEX_PATH = Path(__file__).parent.parent.parent / "state" / "near_duplicates.npz"
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_PRIME = (1 << 61) - 1
+
+
+def shingles(text: str, size: int = 3) -> np.ndarray:
+    """Stable 32-bit hashes of the word n-grams of `text`"""
+    tokens = _TOKEN.findall(str(text or "").lower())
+    if len(tokens) < size:
+        grams = [" ".join(tokens)] if tokens else []
+    else:
+        grams = [" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)]
+    return np.unique(np.array([zlib.crc32(g.encode("utf-8")) for g in grams], dtype=np.uint64))
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        # a, b < 2^32 keep a * h + b inside uint64 for 32-bit shingle hashes
+        self.a = rng.integers(1, 1 << 32, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 32, num_perm, dtype=np.uint64)
+        self.num_perm = num_perm
+
+    def signature(self, hashes: np.ndarray) -> Optional[np.ndarray]:
+        if not len(hashes):
+            return None
+        return ((np.outer(hashes, self.a) + self.b) % _PRIME).min(axis=0).astype(np.uint32)
+
+
+class NearDuplicateIndex:
+    def __init__(self, threshold: float = 0.7, window_days: int = 30, bands: int = 16, rows: int = 4,
+                 max_docs: int = None, path=None):
+        if max_docs is None:
+            max_docs = int(os.getenv("NEAR_DUPLICATE_MAX_DOCS", "1000000"))
+        if path is None:
+            path = os.getenv("NEAR_DUPLICATE_INDEX_PATH", str(DEFAULT_INDEX_PATH))
+        self.threshold = float(threshold)
+        self.window_days = int(window_days)
+        self.bands, self.rows = int(bands), int(rows)
+        self.max_docs = int(max_docs)
+        self.path = Path(path) if path else None
+        self.hasher = MinHasher(self.bands * self.rows)
+        self.lock = threading.Lock()
+
+        # Per-document columns (row i describes one document)
+        self.band_keys = np.zeros((0, self.bands), dtype=np.uint64)
+        self.sig8 = np.zeros((0, self.hasher.num_perm), dtype=np.uint8)
+        self.days = np.zeros(0, dtype=np.int32)
+        self.claim_ids = np.zeros(0, dtype="S40")
+        # Sorted (band key, row) arrays from the last rebuild, plus newer rows
+        self.sorted_keys = np.zeros(0, dtype=np.uint64)
+        self.sorted_rows = np.zeros(0, dtype=np.int64)
+        self.pending = {}        # band key -> [rows]
+        self.pending_rows = []   # (band_keys, sig8, day, claim_id) not yet in the columns
+        self._load()
+
+    def _band_keys(self, signature: np.ndarray) -> np.ndarray:
+        bands = signature.reshape(self.bands, self.rows).astype(np.uint64)
+        # Fold each band's rows into one 64-bit key, seeded with the band number
+        keys = np.arange(1, self.bands + 1, dtype=np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+        for r in range(self.rows):
+            keys = keys * np.uint64(0x100000001B3) ^ bands[:, r]
+        return keys
+
+    def _candidates(self, keys: np.ndarray) -> set:
+        found = set()
+        lo = np.searchsorted(self.sorted_keys, keys, "left")
+        hi = np.searchsorted(self.sorted_keys, keys, "right")
+        for start, end in zip(lo[hi > lo].tolist(), hi[hi > lo].tolist()):
+            found.update(self.sorted_rows[start:end].tolist())
+        for key in keys.tolist():
+            found.update(self.pending.get(key, ()))
+        return found
+
+    def _row(self, row: int):
+        """(sig8, day, claim_id) of a committed or pending row"""
+        committed = len(self.days)
+        if row < committed:
+            return self.sig8[row], int(self.days[row]), self.claim_ids[row].decode()
+        _, sig8, day, claim_id = self.pending_rows[row - committed]
+        return sig8, day, claim_id
+
+    def check_and_add(self, text: str, claim_id: str, today: Optional[date] = None,
+                      update: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Return the most similar other document within the window around
+        `today` (the claim's date; at or above the threshold) and add this
+        one to the index (unless update=False)
+        """
+        signature = self.hasher.signature(shingles(text))
+        if signature is None:
+            return None
+        day = (today or date.today()).toordinal()
+        keys = self._band_keys(signature)
+        sig8 = (signature & 0xFF).astype(np.uint8)
+        claim_id = str(claim_id or "")[:40]
+
+        with self.lock:
+            best = None
+            for row in self._candidates(keys):
+                other_sig, other_day, other_id = self._row(row)
+                if other_id == claim_id or abs(day - other_day) >= self.window_days:
+                    continue
+                # b-bit MinHash: random 8-bit values collide 1/256 of the time
+                matches = float(np.mean(other_sig == sig8))
+                similarity = max(0.0, (matches - 1 / 256) / (1 - 1 / 256))
+                if similarity >= self.threshold and (best is None or similarity > best["similarity"]):
+                    best = {
+                        "claim_id": other_id,
+                        "similarity": round(similarity, 3),
+                        "received": date.fromordinal(other_day).isoformat()
+                    }
+            if not update:
+                return best
+
+            row = len(self.days) + len(self.pending_rows)
+            self.pending_rows.append((keys, sig8, day, claim_id))
+            for key in keys.tolist():
+                self.pending.setdefault(key, []).append(row)
+            # Rebuild once the buffer reaches 10% of the index, so the cost is amortized
+            if len(self.pending_rows) >= max(1000, len(self.days) // 10):
+                # Expire by the newest claim day, capped at today so a mistyped future date can't empty the index
+                newest = max(int(self.days.max()) if len(self.days) else day, max(r[2] for r in self.pending_rows))
+                self._rebuild(min(newest, date.today().toordinal()))
+        return best
+
+    def _rebuild(self, today: int):
+        """Fold pending rows into the columns, drop expired/overflow rows, re-sort bands"""
+        if self.pending_rows:
+            keys, sig8, days, ids = zip(*self.pending_rows)
+            self.band_keys = np.vstack([self.band_keys, np.array(keys, dtype=np.uint64)])
+            self.sig8 = np.vstack([self.sig8, np.array(sig8, dtype=np.uint8)])
+            self.days = np.concatenate([self.days, np.array(days, dtype=np.int32)])
+            self.claim_ids = np.concatenate([self.claim_ids, np.array(ids, dtype="S40")])
+            self.pending_rows = []
+            self.pending = {}
+
+        alive = self.days > today - self.window_days
+        excess = int(alive.sum()) - self.max_docs
+        if excess > 0:
+            alive[np.flatnonzero(alive)[:excess]] = False  # rows are in arrival order: drop the oldest
+        if not alive.all():
+            self.band_keys, self.sig8 = self.band_keys[alive], self.sig8[alive]
+            self.days, self.claim_ids = self.days[alive], self.claim_ids[alive]
+
+        flat = self.band_keys.ravel()
+        order = np.argsort(flat)
+        self.sorted_keys = flat[order]
+        self.sorted_rows = order // self.bands
+        self.snapshot()
+
+    def snapshot(self):
+        """Write the committed columns to disk (atomic replace)"""
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.stem}.{os.getpid()}.tmp.npz")
+        np.savez(tmp, band_keys=self.band_keys, sig8=self.sig8, days=self.days, claim_ids=self.claim_ids)
+        os.replace(tmp, self.path)
+
+    def _load(self):
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            with np.load(self.path) as data:
+                if data["band_keys"].shape[1:] != (self.bands,):
+                    return  # different banding, start over
+                self.band_keys, self.sig8 = data["band_keys"], data["sig8"]
+                self.days, self.claim_ids = data["days"], data["claim_ids"]
+        except (OSError, KeyError, ValueError) as e:
+            print(f"❌ Could not read near-duplicate index {self.path}, starting fresh: {e}")
+            return
+        with self.lock:
+            self._rebuild(date.today().toordinal())
+
+    def __len__(self):
+        return len(self.days) + len(self.pending_rows)
@@ -5,8 +5,47 @@ from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any
 from collections import defaultdict
+from bisect import bisect_left
 import threading
 
+# Upper bounds of the fraud histograms (Prometheus "le" buckets)
+CONTRIBUTION_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.8, 1.0)
+PHASE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Fixed-bucket histogram: observe() is one bisect and three additions"""
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Copy of the counts, safe to read outside the owner's lock"""
+        return {"buckets": self.buckets, "counts": list(self.counts), "sum": self.sum, "count": self.count}
+
+    def prometheus_lines(self, name: str, labels: str) -> list:
+        return histogram_lines(self.snapshot(), name, labels)
+
+
+def histogram_lines(snapshot: Dict[str, Any], name: str, labels: str) -> list:
+    """Prometheus exposition lines of a Histogram.snapshot()"""
+    lines = []
+    cumulative = 0
+    for bound, count in zip(tuple(snapshot["buckets"]) + ("+Inf",), snapshot["counts"]):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    lines.append(f"{name}_sum{{{labels}}} {snapshot['sum']:.6f}")
+    lines.append(f"{name}_count{{{labels}}} {snapshot['count']}")
+    return lines
+
+
 class ClaimsMonitor:
     """
     Real-time monitoring and metrics tracking for claims processing
@@ -31,6 +70,8 @@ class ClaimsMonitor:
                 "summary": []
             }
         }
+        # Fraud phase timings; per-rule hits are counted by the fraud rule engine
+        self.fraud_phase_times = defaultdict(lambda: Histogram(PHASE_BUCKETS))
         self.claims_log = []
         self.lock = threading.Lock()
         self.log_file = Path("logs/claims_processing.log")
@@ -77,33 +118,23 @@ class ClaimsMonitor:
             if error:
                 self.metrics["errors"] += 1
             else:
-                # Track decision
-                decision = result.get("final_decision", {}).get("decision", "UNKNOWN")
-                if decision == "APPROVE":
-                    self.metrics["approved"] += 1
-                elif decision == "REJECT":
-                    self.metrics["rejected"] += 1
-                elif decision == "MANUAL_REVIEW":
-                    self.metrics["manual_review"] += 1
-                
-                # Track fraud level
-                fraud_level = result.get("fraud", {}).get("risk_level", "LOW")
-                if fraud_level == "HIGH":
-                    self.metrics["fraud_high"] += 1
-                elif fraud_level == "MEDIUM":
-                    self.metrics["fraud_medium"] += 1
-                else:
-                    self.metrics["fraud_low"] += 1
+                self._count_outcome(result, 1)
+                self._record_fraud_timings(tracking.get("fraud_timings") or {})
             
-            # Log the claim
+            # Log the claim under its extracted ID (the label key for fraud model training)
             log_entry = {
                 "timestamp": datetime.now().isoformat(),
-                "claim_id": tracking["claim_id"],
+                "claim_id": (result.get("extracted") or {}).get("claim_id") or tracking["claim_id"],
+                "file_name": tracking["claim_id"],
+                "request_id": result.get("request_id"),
                 "total_time": round(total_time, 2),
                 "agent_times": {k: round(v, 2) for k, v in tracking["agent_times"].items()},
                 "decision": result.get("final_decision", {}).get("decision") if not error else "ERROR",
                 "fraud_level": result.get("fraud", {}).get("risk_level") if not error else None,
-                "error": error
+                "error": error,
+                # Training data for the local fraud model (backend/utils/fraud_model.py)
+                "fraud_features": tracking.get("fraud_features") if not error else None,
+                "fraud_timings": {k: round(v, 4) for k, v in (tracking.get("fraud_timings") or {}).items()}
             }
             
             self.claims_log.append(log_entry)
@@ -112,8 +143,62 @@ class ClaimsMonitor:
             with open(self.log_file, "a") as f:
                 f.write(json.dumps(log_entry) + "\n")
     
-    def get_metrics(self) -> Dict[str, Any]:
-        """Get current metrics snapshot"""
+    def _count_outcome(self, result: Dict[str, Any], step: int):
+        """Add (step=1) or remove (step=-1) a claim's decision and fraud level (caller holds the lock)"""
+        # Track decision
+        decision = result.get("final_decision", {}).get("decision", "UNKNOWN")
+        counter = {"APPROVE": "approved", "REJECT": "rejected", "MANUAL_REVIEW": "manual_review"}.get(decision)
+        if counter:
+            self.metrics[counter] += step
+
+        # Track fraud level
+        fraud_level = result.get("fraud", {}).get("risk_level", "LOW")
+        self.metrics[{"HIGH": "fraud_high", "MEDIUM": "fraud_medium"}.get(fraud_level, "fraud_low")] += step
+
+    def revise_claim(self, previous: Dict[str, Any], result: Dict[str, Any]):
+        """Move a completed claim's counts to its revised decision and fraud level"""
+        with self.lock:
+            self._count_outcome(previous, -1)
+            self._count_outcome(result, 1)
+
+    def _record_fraud_timings(self, timings: Dict[str, float]):
+        """Caller holds the lock"""
+        for phase, seconds in timings.items():
+            self.fraud_phase_times[phase].observe(seconds)
+
+    def record_fraud_timings(self, timings: Dict[str, float]):
+        """Phase timings that complete after the claim (late LLM verdicts)"""
+        with self.lock:
+            self._record_fraud_timings(timings)
+
+    def _fraud_rule_metrics(self, rule_stats: Dict[str, Any]) -> Dict[str, Any]:
+        """FraudRuleEngine.rule_stats() as {rule: {hits, by_level, avg_contribution, contribution}}, busiest first"""
+        rules = {}
+        for rule, stats in sorted(rule_stats.get("rules", {}).items(), key=lambda item: -item[1]["hits"]):
+            contribution = stats["contribution"]
+            rules[rule] = {
+                "hits": stats["hits"],
+                "by_level": stats["by_level"],
+                "avg_contribution": round(contribution["sum"] / contribution["count"], 3) if contribution["count"] else 0.0,
+                "contribution": {
+                    f"le_{bound}": count
+                    for bound, count in zip(tuple(contribution["buckets"]) + ("inf",), contribution["counts"])
+                }
+            }
+        return rules
+
+    def _fraud_phase_metrics(self) -> Dict[str, Any]:
+        return {
+            phase: {
+                "calls": times.count,
+                "avg_time": round(times.sum / times.count, 4),
+                "total_time": round(times.sum, 2)
+            }
+            for phase, times in self.fraud_phase_times.items() if times.count
+        }
+
+    def get_metrics(self, rule_stats: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Get current metrics snapshot (rule_stats: FraudRuleEngine.rule_stats())"""
         with self.lock:
             total = self.metrics["total_claims"]
             if total == 0:
@@ -149,14 +234,17 @@ class ClaimsMonitor:
                 "fraud_detection": {
                     "high_risk": self.metrics["fraud_high"],
                     "medium_risk": self.metrics["fraud_medium"],
-                    "low_risk": self.metrics["fraud_low"]
+                    "low_risk": self.metrics["fraud_low"],
+                    "rule_set_version": (rule_stats or {}).get("version"),
+                    "rules": self._fraud_rule_metrics(rule_stats or {}),
+                    "phases": self._fraud_phase_metrics()
                 },
                 "agent_performance": agent_avg,
                 "recent_claims": self.claims_log[-10:]  # Last 10 claims
             }
     
-    def get_prometheus_metrics(self) -> str:
-        """Export metrics in Prometheus format"""
+    def get_prometheus_metrics(self, rule_stats: Dict[str, Any] = None) -> str:
+        """Export metrics in Prometheus format (rule_stats: FraudRuleEngine.rule_stats())"""
         with self.lock:
             lines = [
                 "# HELP claims_total Total number of claims processed",
@@ -192,7 +280,28 @@ class ClaimsMonitor:
                     lines.append(f"# HELP agent_{agent}_avg_seconds Average processing time for {agent} agent")
                     lines.append(f"agent_{agent}_avg_seconds {avg:.3f}")
                     lines.append("")
-            
+
+            # Fraud rule hits by resulting risk level and contribution histograms (from the rule engine)
+            rules = (rule_stats or {}).get("rules", {})
+            if rules:
+                lines.append("# HELP fraud_rule_hits_total Claims on which each fraud rule fired, by risk level")
+                lines.append("# TYPE fraud_rule_hits_total counter")
+                for rule, stats in rules.items():
+                    for level, hits in stats["by_level"].items():
+                        lines.append(f'fraud_rule_hits_total{{rule="{rule}",level="{level}"}} {hits}')
+                lines.append("")
+                lines.append("# HELP fraud_rule_contribution Risk contribution of each fraud rule when it fires")
+                lines.append("# TYPE fraud_rule_contribution histogram")
+                for rule, stats in rules.items():
+                    lines.extend(histogram_lines(stats["contribution"], "fraud_rule_contribution", f'rule="{rule}"'))
+                lines.append("")
+            if self.fraud_phase_times:
+                lines.append("# HELP fraud_phase_seconds Time spent per fraud detection phase (rules, model, llm)")
+                lines.append("# TYPE fraud_phase_seconds histogram")
+                for phase, times in self.fraud_phase_times.items():
+                    lines.extend(times.prometheus_lines("fraud_phase_seconds", f'phase="{phase}"'))
+                lines.append("")
+
             return "\n".join(lines)
 
 # Global monitor instance
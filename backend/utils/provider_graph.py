@@ -0,0 +1,268 @@
+# backend/utils/provider_graph.py
+"""
+Provider-member bipartite graph for collusion-ring detection.
+
+Claims append (provider, member) edges to growable int32 arrays, which is
+O(1) per claim. Every `interval` seconds a background pass deduplicates the
+edges and counts, for each pair of providers, how many members they share.
+Pairs are generated per member, grouped by member degree, so the pass is
+vectorized NumPy; members seen by more than `max_member_degree` providers
+(hubs such as large employers) are skipped to keep the pair count bounded.
+Provider pairs sharing at least `min_shared_members` with a Jaccard
+overlap of at least `min_ring_score` are linked, and the linked components
+are the candidate rings. The scores are published as one dict swap, so
+each claim gets an O(1) lookup of its provider's score.
+
+Each edge carries its claim's day. Like the velocity and near-duplicate
+indexes, the graph only covers the last `window_days` (counted from the
+newest claim day, capped at today): each scoring pass drops older edges,
+and past `max_edges` distinct edges the oldest go first. The surviving
+providers and members are then renumbered densely, so the ID maps shrink
+with the edges.
+"""
+import os
+import threading
+from datetime import date
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+from .amount_stats import provider_key
+from .claim_time import claim_day
+
+DEFAULT_GRAPH_PATH = Path(__file__).parent.parent.parent / "state" / "provider_graph.npz"
+
+
+class _GrowableInts:
+    def __init__(self, capacity: int = 1 << 16):
+        self.data = np.zeros(capacity, dtype=np.int32)
+        self.size = 0
+
+    def append(self, value: int):
+        if self.size == len(self.data):
+            grown = np.zeros(len(self.data) * 2, dtype=np.int32)
+            grown[:self.size] = self.data
+            self.data = grown
+        self.data[self.size] = value
+        self.size += 1
+
+    def view(self) -> np.ndarray:
+        return self.data[:self.size]
+
+    def replace(self, values: np.ndarray):
+        self.data = np.zeros(max(1 << 16, len(values) * 2), dtype=np.int32)
+        self.data[:len(values)] = values
+        self.size = len(values)
+
+
+def _compact(ids: np.ndarray, n: int):
+    """Dense renumbering of the IDs still in use: (old -> new lookup, old IDs kept)"""
+    used = np.zeros(n, dtype=bool)
+    used[ids] = True
+    return np.cumsum(used) - 1, np.flatnonzero(used)
+
+
+def _components(n: int, u: np.ndarray, v: np.ndarray) -> np.ndarray:
+    """Connected-component labels by min-label propagation with pointer jumping"""
+    labels = np.arange(n)
+    while True:
+        previous = labels.copy()
+        np.minimum.at(labels, u, labels[v])
+        np.minimum.at(labels, v, labels[u])
+        labels = labels[labels]
+        if np.array_equal(labels, previous):
+            return labels
+
+
+class ProviderMemberGraph:
+    def __init__(self, min_shared_members: int = 5, min_ring_score: float = 0.5,
+                 max_member_degree: int = 50, window_days: int = None, max_edges: int = None,
+                 interval: float = None, path=None):
+        if window_days is None:
+            window_days = int(os.getenv("PROVIDER_GRAPH_WINDOW_DAYS", "365"))
+        if max_edges is None:
+            max_edges = int(os.getenv("PROVIDER_GRAPH_MAX_EDGES", "5000000"))
+        if interval is None:
+            interval = float(os.getenv("PROVIDER_GRAPH_SCORE_SECONDS", "300"))
+        if path is None:
+            path = os.getenv("PROVIDER_GRAPH_PATH", str(DEFAULT_GRAPH_PATH))
+        self.min_shared_members = int(min_shared_members)
+        self.min_ring_score = float(min_ring_score)
+        self.max_member_degree = int(max_member_degree)
+        self.window_days = int(window_days)
+        self.max_edges = int(max_edges)
+        self.interval = interval
+        self.path = Path(path) if path else None
+        self.lock = threading.Lock()
+
+        self.provider_ids = {}   # provider key -> index
+        self.member_ids = {}     # member id -> index
+        self.providers = _GrowableInts()
+        self.members = _GrowableInts()
+        self.days = _GrowableInts()  # claim day ordinal per edge
+        self.newest = 0
+        self.scores = {}         # provider key -> {"score", "ring_size", "ring_id"}
+        self.scored_edges = 0
+        self._load()
+        if self.providers.size:
+            self.score()
+
+        self._stop = threading.Event()
+        self._thread = None
+        if interval > 0:
+            self._thread = threading.Thread(target=self._watch, name="provider-graph-score", daemon=True)
+            self._thread.start()
+
+    def add_claim(self, claim_data: dict):
+        provider = provider_key(claim_data)
+        member = str(claim_data.get("member_id", "") or "").strip().upper()
+        if not provider or not member:
+            return
+        day = claim_day(claim_data)
+        with self.lock:
+            p = self.provider_ids.setdefault(provider, len(self.provider_ids))
+            m = self.member_ids.setdefault(member, len(self.member_ids))
+            self.providers.append(p)
+            self.members.append(m)
+            self.days.append(day)
+            self.newest = max(self.newest, day)
+
+    def ring_score(self, claim_data: dict) -> Optional[Dict[str, Any]]:
+        """The provider's latest ring score, or None if it is not in a ring"""
+        return self.scores.get(provider_key(claim_data))
+
+    def score(self):
+        """Expire old edges, recompute ring scores over the rest and publish them"""
+        with self.lock:
+            seen = self.providers.size
+            providers = self.providers.view().astype(np.int64)
+            members = self.members.view().astype(np.int64)
+            days = self.days.view().copy()
+            names = list(self.provider_ids)
+            # Capped at today so a mistyped future date can't expire the whole graph
+            horizon = min(self.newest, date.today().toordinal())
+
+        # Deduplicate (member, provider) edges, sorted by member, keeping each edge's latest day
+        n_providers = len(names)
+        keys = members * max(n_providers, 1) + providers
+        order = np.lexsort((days, keys))
+        keys, days = keys[order], days[order]
+        latest = np.r_[keys[1:] != keys[:-1], True] if len(keys) else np.zeros(0, dtype=bool)
+        edges, days = keys[latest], days[latest]
+
+        # Drop edges outside the window, then the oldest beyond max_edges
+        alive = days > horizon - self.window_days
+        edges, days = edges[alive], days[alive]
+        if len(edges) > self.max_edges:
+            keep = np.sort(np.argsort(days, kind="stable")[len(edges) - self.max_edges:])
+            edges, days = edges[keep], days[keep]
+        members, providers = edges // max(n_providers, 1), edges % max(n_providers, 1)
+        degree = np.bincount(providers, minlength=n_providers)
+
+        # Provider pairs sharing each member, grouped by member degree so each group is one reshape
+        starts = np.flatnonzero(np.r_[True, members[1:] != members[:-1]])
+        sizes = np.diff(np.r_[starts, len(members)])
+        pair_keys = []
+        for d in np.unique(sizes):
+            if d < 2 or d > self.max_member_degree:
+                continue
+            block = providers[starts[sizes == d][:, None] + np.arange(d)]
+            i, j = np.triu_indices(d, k=1)
+            a, b = block[:, i].ravel(), block[:, j].ravel()
+            pair_keys.append(np.minimum(a, b) * n_providers + np.maximum(a, b))
+
+        scores = {}
+        if pair_keys:
+            keys, shared = np.unique(np.concatenate(pair_keys), return_counts=True)
+            a, b = keys // n_providers, keys % n_providers
+            jaccard = shared / (degree[a] + degree[b] - shared)
+            strong = (shared >= self.min_shared_members) & (jaccard >= self.min_ring_score)
+            a, b, jaccard = a[strong], b[strong], jaccard[strong]
+            if len(a):
+                best = np.zeros(n_providers)
+                np.maximum.at(best, a, jaccard)
+                np.maximum.at(best, b, jaccard)
+                labels = _components(n_providers, a, b)
+                ring_sizes = np.bincount(labels, minlength=n_providers)
+                for p in np.flatnonzero(best > 0):
+                    scores[names[p]] = {
+                        "score": round(float(best[p]), 4),
+                        "ring_size": int(ring_sizes[labels[p]]),
+                        "ring_id": int(labels[p]),
+                    }
+
+        self.scores = scores
+        self.scored_edges = len(edges)
+
+        with self.lock:
+            # Keep the deduplicated live edges plus anything appended during scoring,
+            # renumbering providers and members so expired ones leave the ID maps
+            providers = np.concatenate([providers, self.providers.view()[seen:]])
+            members = np.concatenate([members, self.members.view()[seen:]])
+            days = np.concatenate([days, self.days.view()[seen:]])
+            provider_names, member_names = list(self.provider_ids), list(self.member_ids)
+            provider_map, kept_providers = _compact(providers, len(provider_names))
+            member_map, kept_members = _compact(members, len(member_names))
+            self.provider_ids = {provider_names[i]: k for k, i in enumerate(kept_providers)}
+            self.member_ids = {member_names[i]: k for k, i in enumerate(kept_members)}
+            self.providers.replace(provider_map[providers])
+            self.members.replace(member_map[members])
+            self.days.replace(days)
+        self.snapshot()
+        return len(scores)
+
+    def snapshot(self):
+        """Write the edge list and ID maps to disk (atomic replace)"""
+        if self.path is None:
+            return
+        with self.lock:
+            data = {
+                "providers": self.providers.view().copy(),
+                "members": self.members.view().copy(),
+                "days": self.days.view().copy(),
+                "provider_ids": np.array(list(self.provider_ids), dtype=object),
+                "member_ids": np.array(list(self.member_ids), dtype=object),
+            }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.stem}.{os.getpid()}.tmp.npz")
+        np.savez(tmp, **data)
+        os.replace(tmp, self.path)
+
+    def _load(self):
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            with np.load(self.path, allow_pickle=True) as data:
+                self.provider_ids = {str(k): i for i, k in enumerate(data["provider_ids"])}
+                self.member_ids = {str(k): i for i, k in enumerate(data["member_ids"])}
+                self.providers.replace(data["providers"])
+                self.members.replace(data["members"])
+                days = data["days"]
+                self.days.replace(days)
+                self.newest = int(days.max()) if len(days) else 0
+        except (OSError, KeyError, ValueError) as e:
+            print(f"❌ Could not read provider graph snapshot {self.path}, starting fresh: {e}")
+            self.provider_ids, self.member_ids = {}, {}
+            self.providers, self.members, self.days = _GrowableInts(), _GrowableInts(), _GrowableInts()
+            self.newest = 0
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.score()
+            except Exception as e:
+                print(f"❌ Provider graph scoring failed: {e}")
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "providers": len(self.provider_ids),
+            "members": len(self.member_ids),
+            "edges": self.providers.size,
+            "scored_edges": self.scored_edges,
+            "window_days": self.window_days,
+            "providers_in_rings": len(self.scores),
+        }
@@ -0,0 +1,219 @@
+# backend/utils/quantile_sketch.py
+"""
+Streaming quantiles of billed amounts per CPT code and per provider specialty.
+
+Each peer group holds a KLL sketch: a stack of compactors where level h
+items stand for 2^h observations. When the sketch is full the lowest
+overfull level is sorted and every other item is promoted, so memory stays
+around k / (1 - c) (600 by default) items per group whatever the volume,
+updates cost amortized O(log k), and two sketches merge by concatenating
+levels and compacting.
+State is snapshotted to JSON; snapshots from several workers can be merged:
+
+    python -m backend.utils.quantile_sketch merge out.json worker1.json worker2.json
+"""
+import os
+import sys
+import json
+import random
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+DEFAULT_QUANTILES_PATH = Path(__file__).parent.parent.parent / "state" / "amount_quantiles.json"
+
+
+class KLLSketch:
+    def __init__(self, k: int = 200, c: float = 2 / 3, compactors: List[List[float]] = None, n: int = 0):
+        self.k = int(k)
+        self.c = float(c)
+        self.compactors = compactors if compactors else [[]]
+        self.n = int(n)
+        self.size = sum(len(level) for level in self.compactors)
+        # Own seeded generator: identical update streams give identical sketches
+        self._rng = random.Random(self.n)
+        self._update_max_size()
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.compactors) - level - 1
+        return int(self.k * self.c ** depth) + 1
+
+    def _update_max_size(self):
+        self.max_size = sum(self._capacity(h) for h in range(len(self.compactors)))
+
+    def update(self, value: float):
+        self.compactors[0].append(float(value))
+        self.n += 1
+        self.size += 1
+        if self.size >= self.max_size:
+            self._compress()
+
+    def _compress(self):
+        for h, level in enumerate(self.compactors):
+            if len(level) >= self._capacity(h):
+                if h + 1 >= len(self.compactors):
+                    self.compactors.append([])
+                    self._update_max_size()
+                level.sort()
+                # Keep the odd item (if any) at this level, promote every other item
+                keep = [level.pop()] if len(level) % 2 else []
+                self.compactors[h + 1].extend(level[self._rng.getrandbits(1)::2])
+                self.compactors[h] = keep
+                self.size = sum(len(items) for items in self.compactors)
+                if self.size < self.max_size:
+                    break
+
+    def merge(self, other: "KLLSketch"):
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for h, level in enumerate(other.compactors):
+            self.compactors[h].extend(level)
+        self.n += other.n
+        self.size = sum(len(level) for level in self.compactors)
+        self._update_max_size()
+        while self.size >= self.max_size:
+            self._compress()
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate value at quantile q (0..1)"""
+        if not self.n:
+            return None
+        weighted = sorted((x, 1 << h) for h, level in enumerate(self.compactors) for x in level)
+        target = q * sum(w for _, w in weighted)
+        cumulative = 0
+        for value, weight in weighted:
+            cumulative += weight
+            if cumulative >= target:
+                return value
+        return weighted[-1][0]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"k": self.k, "n": self.n, "compactors": self.compactors}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "KLLSketch":
+        return cls(k=data.get("k", 200), compactors=[list(level) for level in data["compactors"]], n=data["n"])
+
+
+def _line_amounts(claim_data: dict, codes: List[str], amount: float) -> List[float]:
+    line_amounts = claim_data.get("line_amounts") or []
+    return [float(line_amounts[i]) if i < len(line_amounts) else amount / len(codes) for i in range(len(codes))]
+
+
+class PeerQuantiles:
+    """
+    KLL sketches keyed "cpt:<code>" and "specialty:<name>". Claims are
+    compared against the current sketch before being added to it.
+    """
+    def __init__(self, percentile: float = 0.99, min_samples: int = 50, k: int = 200,
+                 path=None, snapshot_every: int = 500):
+        if path is None:
+            path = os.getenv("AMOUNT_QUANTILES_PATH", str(DEFAULT_QUANTILES_PATH))
+        self.percentile = float(percentile)
+        self.min_samples = int(min_samples)
+        self.k = int(k)
+        self.path = Path(path) if path else None
+        self.snapshot_every = int(snapshot_every)
+        self.lock = threading.Lock()
+        self.sketches = {}
+        self._thresholds = {}  # key -> (n when computed, value)
+        self._dirty = 0
+        self._load()
+
+    def _load(self):
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            self.sketches = {key: KLLSketch.from_dict(s) for key, s in json.loads(self.path.read_text()).items()}
+        except (json.JSONDecodeError, KeyError, TypeError) as e:
+            print(f"❌ Could not read amount quantiles snapshot {self.path}, starting fresh: {e}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self.lock:
+            return {key: sketch.to_dict() for key, sketch in self.sketches.items()}
+
+    def snapshot(self):
+        """Write all sketches to disk (atomic replace)"""
+        if self.path is None:
+            return
+        data = json.dumps(self.to_dict(), separators=(",", ":"))
+        self._dirty = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(data)
+        os.replace(tmp, self.path)
+
+    def merge(self, other: "PeerQuantiles"):
+        with self.lock:
+            for key, sketch in other.sketches.items():
+                mine = self.sketches.get(key)
+                if mine is None:
+                    self.sketches[key] = KLLSketch.from_dict(sketch.to_dict())
+                else:
+                    mine.merge(sketch)
+                self._thresholds.pop(key, None)
+
+    def threshold(self, key: str) -> Optional[float]:
+        sketch = self.sketches.get(key)
+        if sketch is None or sketch.n < self.min_samples:
+            return None
+        # A quantile query sorts the sketch; reuse it until the group grows by ~1%
+        cached = self._thresholds.get(key)
+        if cached is None or sketch.n - cached[0] > max(10, cached[0] // 100):
+            cached = self._thresholds[key] = (sketch.n, sketch.quantile(self.percentile))
+        return cached[1]
+
+    def check(self, claim_data: dict, update: bool = True) -> List[Dict[str, Any]]:
+        """
+        Return the peer groups whose percentile this claim's amounts exceed,
+        then add the amounts to the sketches (unless update=False)
+        """
+        try:
+            amount = float(claim_data.get("claim_amount", 0) or 0)
+        except (TypeError, ValueError):
+            return []
+        if amount <= 0:
+            return []
+
+        codes = [str(c).strip() for c in claim_data.get("procedure_codes", [])]
+        observations = []
+        if codes:
+            for code, line in zip(codes, _line_amounts(claim_data, codes, amount)):
+                observations.append((f"cpt:{code}", f"CPT {code}", line))
+        specialty = str(claim_data.get("provider_specialty", "") or "").strip().lower()
+        if specialty:
+            observations.append((f"specialty:{specialty}", f"specialty {specialty}", amount))
+
+        outliers = []
+        with self.lock:
+            for key, label, value in observations:
+                limit = self.threshold(key)
+                if limit is not None and value > limit:
+                    outliers.append({"scope": label, "amount": round(value, 2), "threshold": round(limit, 2)})
+            if not update:
+                return outliers
+            for key, _, value in observations:
+                sketch = self.sketches.get(key)
+                if sketch is None:
+                    sketch = self.sketches[key] = KLLSketch(self.k)
+                sketch.update(value)
+            self._dirty += 1
+            due = self.snapshot_every and self._dirty >= self.snapshot_every
+        if due:
+            self.snapshot()
+        return outliers
+
+
+def main():
+    if len(sys.argv) < 4 or sys.argv[1] != "merge":
+        raise SystemExit("usage: python -m backend.utils.quantile_sketch merge OUT.json IN.json [IN.json ...]")
+    merged = PeerQuantiles(path="")
+    for src in sys.argv[3:]:
+        merged.merge(PeerQuantiles(path=src))
+    merged.path = Path(sys.argv[2])
+    merged.snapshot()
+    print(f"Merged {len(sys.argv) - 3} snapshots into {merged.path} ({len(merged.sketches)} peer groups)")
+
+
+if __name__ == "__main__":
+    main()
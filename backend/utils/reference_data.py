@@ -0,0 +1,133 @@
+# backend/utils/reference_data.py
+"""
+Versioned, hot-reloadable snapshots of the validation reference data.
+
+A snapshot bundles every reference table ValidationAgent reads: members,
+coverage rules, authorizations, medical necessity, frequency limits and
+fee schedule. A background thread polls the source files. When one changes,
+it builds a new snapshot off the request path, reusing the components whose
+files didn't change, and swaps it in with a single reference assignment.
+Claims already in flight keep the snapshot they started with.
+"""
+import os
+import hashlib
+import threading
+from typing import Dict, Optional
+
+from .member_store import open_member_store, member_store_path
+from .coverage_rules import CompiledCoverageRules, DEFAULT_RULES_PATH
+from .auth_registry import open_auth_registry, auth_registry_path
+from .medical_necessity import MedicalNecessityMatrix, DEFAULT_MATRIX_PATH
+from .claims_history import FrequencyLimits, DEFAULT_LIMITS_PATH
+from .fee_schedule import FeeSchedule, DEFAULT_SCHEDULE_PATH
+
+
+def _sources() -> Dict[str, tuple]:
+    """Component name -> (source path, loader)"""
+    return {
+        "members": (member_store_path(), open_member_store),
+        "coverage": (DEFAULT_RULES_PATH, CompiledCoverageRules.from_file),
+        "authorizations": (auth_registry_path(), open_auth_registry),
+        "necessity": (DEFAULT_MATRIX_PATH, MedicalNecessityMatrix.from_file),
+        "frequency": (DEFAULT_LIMITS_PATH, FrequencyLimits.from_file),
+        "fees": (DEFAULT_SCHEDULE_PATH, FeeSchedule.from_file),
+    }
+
+
+def _signature(path) -> Optional[tuple]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+class ReferenceSnapshot:
+    """Immutable bundle of reference tables plus the version they came from"""
+
+    def __init__(self, components: Dict[str, object], signatures: Dict[str, Optional[tuple]]):
+        self.members = components["members"]
+        self.coverage = components["coverage"]
+        self.authorizations = components["authorizations"]
+        self.necessity = components["necessity"]
+        self.frequency = components["frequency"]
+        self.fees = components["fees"]
+        self.components = components
+        self.signatures = signatures
+
+        digest = hashlib.sha256(repr(sorted(signatures.items())).encode("utf-8"))
+        self.version = digest.hexdigest()[:12]
+
+
+class ReferenceDataManager:
+    """
+    Holds the current snapshot and refreshes it in the background every
+    `interval` seconds (REFERENCE_DATA_RELOAD_SECONDS, 0 disables polling)
+    """
+    def __init__(self, interval: float = None):
+        if interval is None:
+            interval = float(os.getenv("REFERENCE_DATA_RELOAD_SECONDS", "30"))
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.reloads = 0
+        self.last_error = None
+        self.snapshot = self._build(previous=None)
+
+        self._stop = threading.Event()
+        self._thread = None
+        if interval > 0:
+            self._thread = threading.Thread(target=self._watch, name="reference-data-reload", daemon=True)
+            self._thread.start()
+
+    def _build(self, previous: Optional[ReferenceSnapshot]) -> ReferenceSnapshot:
+        components = {}
+        signatures = {}
+        for name, (path, loader) in _sources().items():
+            signature = _signature(path)
+            signatures[name] = signature
+            if previous is not None and previous.signatures.get(name) == signature:
+                components[name] = previous.components[name]
+            else:
+                components[name] = loader(path)
+        return ReferenceSnapshot(components, signatures)
+
+    def changed(self) -> bool:
+        """True if any source file differs from the current snapshot"""
+        current = self.snapshot.signatures
+        return any(_signature(path) != current.get(name) for name, (path, _) in _sources().items())
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Build and swap in a new snapshot if sources changed (or force=True).
+        Returns True when a new snapshot was published.
+        """
+        with self.lock:
+            if not force and not self.changed():
+                return False
+            snapshot = self._build(previous=None if force else self.snapshot)
+            # Single reference assignment: readers see either the old or the new snapshot
+            self.snapshot = snapshot
+            self.reloads += 1
+            print(f"Reference data reloaded (version {snapshot.version})")
+            return True
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.reload()
+                self.last_error = None
+            except Exception as e:
+                # Keep serving the last good snapshot
+                self.last_error = str(e)
+                print(f"❌ Reference data reload failed: {e}")
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self) -> dict:
+        return {
+            "version": self.snapshot.version,
+            "reloads": self.reloads,
+            "poll_interval_seconds": self.interval,
+            "last_error": self.last_error
+        }
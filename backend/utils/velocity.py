@@ -0,0 +1,245 @@
+# backend/utils/velocity.py
+"""
+Member and provider submission velocity (claims and dollars per 1h/24h/30d).
+
+Every key owns one row of fixed-size ring buffers: 12 five-minute buckets
+for the last hour, 24 hourly buckets for the last day and 30 daily buckets
+for the last month, plus running totals per window. Time is the claim's
+received (or service) time, not the wall clock. Recording a claim advances
+the rings (clearing buckets that fell out of the window) and adds to the
+current bucket, so in-order updates and reads are O(1) with constant memory
+per key; a claim older than the key's newest one sums the overlapping
+buckets instead. Rows live in shared NumPy arrays capped at `max_keys`; the least
+recently active key is recycled when the cap is reached. State can be
+snapshotted to an .npz file and reloaded on startup.
+"""
+import os
+import time
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from .amount_stats import provider_key
+from .claim_time import claim_timestamp
+
+DEFAULT_VELOCITY_PATH = Path(__file__).parent.parent.parent / "state" / "velocity.npz"
+
+# name -> (window seconds, buckets)
+WINDOWS = OrderedDict([
+    ("1h", (3600, 12)),
+    ("24h", (86400, 24)),
+    ("30d", (30 * 86400, 30)),
+])
+
+
+class VelocityCounters:
+    def __init__(self, max_keys: int = None, path=None, snapshot_every: int = 1000):
+        if max_keys is None:
+            max_keys = int(os.getenv("VELOCITY_MAX_KEYS", "100000"))
+        if path is None:
+            path = os.getenv("VELOCITY_PATH", str(DEFAULT_VELOCITY_PATH))
+        self.max_keys = int(max_keys)
+        self.path = Path(path) if path else None
+        self.snapshot_every = int(snapshot_every)
+        self.lock = threading.Lock()
+
+        self.widths = np.array([span / buckets for span, buckets in WINDOWS.values()])
+        self.sizes = [buckets for _, buckets in WINDOWS.values()]
+        self.offsets = np.cumsum([0] + self.sizes[:-1]).tolist()
+        self.slots = OrderedDict()      # key -> row, least recently active first
+        self._allocate(min(1024, self.max_keys))
+        self._dirty = 0
+        self._load()
+
+    def _allocate(self, rows: int):
+        buckets, windows = sum(self.sizes), len(self.sizes)
+        self.counts = np.zeros((rows, buckets), dtype=np.int32)
+        self.amounts = np.zeros((rows, buckets), dtype=np.float64)
+        self.heads = np.zeros((rows, windows), dtype=np.int64)       # newest bucket epoch per window
+        self.total_counts = np.zeros((rows, windows), dtype=np.int64)
+        self.total_amounts = np.zeros((rows, windows), dtype=np.float64)
+
+    def _grow(self):
+        rows = min(self.max_keys, len(self.counts) * 2)
+        old = (self.counts, self.amounts, self.heads, self.total_counts, self.total_amounts)
+        self._allocate(rows)
+        for new, prev in zip((self.counts, self.amounts, self.heads, self.total_counts, self.total_amounts), old):
+            new[:len(prev)] = prev
+
+    def _slot(self, key: str, epochs) -> int:
+        row = self.slots.get(key)
+        if row is not None:
+            self.slots.move_to_end(key)
+            return row
+        if len(self.slots) >= self.max_keys:
+            _, row = self.slots.popitem(last=False)
+        else:
+            if len(self.slots) >= len(self.counts):
+                self._grow()
+            row = len(self.slots)
+        self.slots[key] = row
+        self.counts[row] = 0
+        self.amounts[row] = 0.0
+        self.total_counts[row] = 0
+        self.total_amounts[row] = 0.0
+        self.heads[row] = epochs
+        return row
+
+    def _advance(self, row: int, epochs):
+        """Clear the buckets each window has moved past since the row's last update"""
+        for w, epoch in enumerate(epochs):
+            head = int(self.heads[row, w])
+            if epoch <= head:
+                continue
+            size, offset = self.sizes[w], self.offsets[w]
+            for e in range(head + 1, head + 1 + min(epoch - head, size)):
+                idx = offset + e % size
+                self.total_counts[row, w] -= self.counts[row, idx]
+                self.total_amounts[row, w] -= self.amounts[row, idx]
+                self.counts[row, idx] = 0
+                self.amounts[row, idx] = 0.0
+            self.heads[row, w] = epoch
+
+    def _epochs(self, now: Optional[float]) -> List[int]:
+        return (np.floor((now if now is not None else time.time()) / self.widths)).astype(np.int64).tolist()
+
+    def _totals(self, row: Optional[int], epochs, unstored: List[bool], amount: float) -> Dict[str, Dict[str, float]]:
+        """
+        Totals of each window ending at the claim's epoch; `unstored` windows
+        don't hold the claim in their buckets, so it is added on top
+        """
+        totals = {}
+        for w, (name, epoch) in enumerate(zip(WINDOWS, epochs)):
+            count, total = 0, 0.0
+            if row is not None:
+                head = int(self.heads[row, w])
+                if epoch == head:
+                    count, total = int(self.total_counts[row, w]), float(self.total_amounts[row, w])
+                else:
+                    # Buckets kept are (head - size, head]; the window is (epoch - size, epoch]
+                    size, offset = self.sizes[w], self.offsets[w]
+                    for e in range(max(head, epoch) - size + 1, min(head, epoch) + 1):
+                        count += int(self.counts[row, offset + e % size])
+                        total += float(self.amounts[row, offset + e % size])
+            if unstored[w]:
+                count, total = count + 1, total + amount
+            totals[name] = {"claims": count, "amount": round(total, 2)}
+        return totals
+
+    def record(self, key: str, amount: float, now: Optional[float] = None) -> Dict[str, Dict[str, float]]:
+        """Add one claim for `key` and return its totals per window (including this claim)"""
+        epochs = self._epochs(now)
+        with self.lock:
+            row = self._slot(key, epochs)
+            self._advance(row, epochs)
+            unstored = []
+            for w, epoch in enumerate(epochs):
+                # Older than everything the ring still holds: count it, but don't store it
+                expired = epoch <= int(self.heads[row, w]) - self.sizes[w]
+                unstored.append(expired)
+                if not expired:
+                    idx = self.offsets[w] + epoch % self.sizes[w]
+                    self.counts[row, idx] += 1
+                    self.amounts[row, idx] += amount
+                    self.total_counts[row, w] += 1
+                    self.total_amounts[row, w] += amount
+            totals = self._totals(row, epochs, unstored, amount)
+            self._dirty += 1
+            due = self.path is not None and self.snapshot_every and self._dirty >= self.snapshot_every
+        if due:
+            self.snapshot()
+        return totals
+
+    def peek(self, key: str, amount: float, now: Optional[float] = None) -> Dict[str, Dict[str, float]]:
+        """The totals record() would return, without changing any state"""
+        epochs = self._epochs(now)
+        with self.lock:
+            return self._totals(self.slots.get(key), epochs, [True] * len(epochs), amount)
+
+    def snapshot(self):
+        """Write used rows to disk (atomic replace)"""
+        if self.path is None:
+            return
+        with self.lock:
+            keys = list(self.slots)
+            rows = np.array([self.slots[k] for k in keys], dtype=np.int64)
+            data = {
+                "keys": np.array(keys, dtype=object),
+                "counts": self.counts[rows], "amounts": self.amounts[rows], "heads": self.heads[rows],
+                "total_counts": self.total_counts[rows], "total_amounts": self.total_amounts[rows],
+            }
+            self._dirty = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.stem}.{os.getpid()}.tmp.npz")
+        np.savez(tmp, **data)
+        os.replace(tmp, self.path)
+
+    def _load(self):
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            with np.load(self.path, allow_pickle=True) as data:
+                keys = [str(k) for k in data["keys"]][-self.max_keys:]
+                n = len(keys)
+                if not n:
+                    return
+                while len(self.counts) < n:
+                    self._grow()
+                self.counts[:n] = data["counts"][-n:]
+                self.amounts[:n] = data["amounts"][-n:]
+                self.heads[:n] = data["heads"][-n:]
+                self.total_counts[:n] = data["total_counts"][-n:]
+                self.total_amounts[:n] = data["total_amounts"][-n:]
+                self.slots = OrderedDict((k, i) for i, k in enumerate(keys))
+        except (OSError, KeyError, ValueError) as e:
+            print(f"❌ Could not read velocity snapshot {self.path}, starting fresh: {e}")
+
+    def __len__(self):
+        return len(self.slots)
+
+
+class VelocityChecker:
+    """
+    Applies the fraud_rules.json "velocity_limits" to member and provider
+    counters, e.g. {"member": {"24h": {"claims": 10, "amount": 25000}}}
+    """
+    def __init__(self, limits: Dict[str, Any], counters: VelocityCounters = None):
+        self.limits = {
+            scope: {window: dict(v) for window, v in windows.items() if window in WINDOWS}
+            for scope, windows in (limits or {}).items() if scope in ("member", "provider")
+        }
+        self.counters = counters if counters is not None else VelocityCounters()
+
+    def check(self, claim_data: dict, now: Optional[float] = None, update: bool = True) -> List[Dict[str, Any]]:
+        """
+        Record the claim (unless update=False) and return every limit its
+        member or provider exceeds at the claim's time
+        """
+        if now is None:
+            now = claim_timestamp(claim_data)
+        try:
+            amount = float(claim_data.get("claim_amount", 0) or 0)
+        except (TypeError, ValueError):
+            amount = 0.0
+        keys = {
+            "member": str(claim_data.get("member_id", "") or "").strip().upper(),
+            "provider": provider_key(claim_data),
+        }
+
+        exceeded = []
+        for scope, key in keys.items():
+            if not key:
+                continue
+            record = self.counters.record if update else self.counters.peek
+            totals = record(f"{scope[0]}:{key}", amount, now)
+            for window, limit in self.limits.get(scope, {}).items():
+                for measure in ("claims", "amount"):
+                    if measure in limit and totals[window][measure] > limit[measure]:
+                        exceeded.append({
+                            "scope": scope, "window": window, "measure": measure,
+                            "value": totals[window][measure], "limit": limit[measure]
+                        })
+        return exceeded
@@ -110,7 +110,7 @@ if message:
 
 st.write("---")
 
-# 4 validation blocks
+# 6 validation blocks
 st.header("Validation Checks")
 
 col1, col2 = st.columns(2)
@@ -118,10 +118,12 @@ col1, col2 = st.columns(2)
 with col1:
     status_box("Eligibility Check", validation_results.get("eligibility", {}))
     status_box("Authorization Check", validation_results.get("authorization", {}))
+    status_box("Medical Necessity Check", validation_results.get("medical_necessity", {}))
 
 with col2:
     status_box("Coverage Check", validation_results.get("coverage", {}))
     status_box("Business Rules Evaluation", validation_results.get("business_rules", {}))
+    status_box("Frequency Limits Check", validation_results.get("frequency", {}))
 
 # Navigation
 st.write("---")